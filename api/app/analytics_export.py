@@ -0,0 +1,180 @@
+"""
+Offline analytics export of settled bets to hour-partitioned columnar files
+
+A background task moves bets older than the retention window out of
+`bet_history` and writes them column-wise under
+
+    <directory>/date=YYYY-MM-DD/hour=HH/bets-<stamp>-<writer>-<pid>-<seq>.<ext>
+
+as Parquet when pyarrow is installed, otherwise as NumPy .npz archives with
+dictionary-encoded string columns. Reporting reads these files with
+analytics_query.py and never touches the live API process.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("bet_id", "user_id", "game_type", "result", "amount", "win_amount", "timestamp")
+
+
+def default_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "npz"
+
+
+class BetExporter:
+    """Flushes settled bets from bet_history into columnar files"""
+
+    def __init__(self, bet_history: Dict[str, Dict], directory: str,
+                 interval_seconds: float = 60.0, retain_seconds: float = 3600.0,
+                 max_rows: int = 500_000, fmt: Optional[str] = None):
+        self.bet_history = bet_history
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.retain_seconds = retain_seconds
+        self.max_rows = max_rows
+        self.fmt = fmt or default_format()
+        self.rows_exported = 0
+        self._seq = 0
+        # Workers and pods may share the directory, and the timestamp and sequence
+        # alone can repeat across them; a random id plus the pid (for workers forked
+        # after import) keeps every writer's file names distinct
+        self._writer_id = uuid.uuid4().hex[:12]
+        # Rows from a failed flush, retried first so export order is preserved
+        self._retry: List[Tuple[str, Dict]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def collect(self, now: Optional[datetime] = None) -> List[Tuple[str, Dict]]:
+        """Remove and return bets older than the retention window, oldest first"""
+        cutoff = ((now or datetime.utcnow()) - timedelta(seconds=self.retain_seconds)).isoformat()
+        rows, self._retry = self._retry, []
+        fresh = []
+        # bet_history is insertion ordered, so stop at the first bet inside the window
+        for bet_id, bet in self.bet_history.items():
+            if bet["timestamp"] >= cutoff or len(rows) + len(fresh) >= self.max_rows:
+                break
+            fresh.append((bet_id, bet))
+        for bet_id, _ in fresh:
+            del self.bet_history[bet_id]
+        return rows + fresh
+
+    def write(self, rows: List[Tuple[str, Dict]]) -> List[str]:
+        """Write rows as one file per hour partition; returns the paths written
+
+        All-or-nothing: every partition is written to a temp file first and the
+        files are only renamed into place once all of them succeeded, so a
+        failed flush can be retried without double-counting any bet.
+        """
+        import numpy as np
+
+        timestamps = np.array([bet["timestamp"] for _, bet in rows], dtype="datetime64[us]")
+        columns = {
+            "bet_id": np.array([bet_id for bet_id, _ in rows]),
+            "user_id": np.array([bet["user_id"] for _, bet in rows]),
+            "game_type": np.array([bet["game_type"] for _, bet in rows]),
+            "result": np.array([bet["result"] for _, bet in rows]),
+            "amount": np.array([bet["amount"] for _, bet in rows], dtype=np.float64),
+            "win_amount": np.array([bet["win_amount"] for _, bet in rows], dtype=np.float64),
+            "timestamp": timestamps,
+        }
+        hours = timestamps.astype("datetime64[h]")
+        paths = []
+        stamp = int(time.time() * 1000)
+        try:
+            for hour in np.unique(hours):
+                mask = hours == hour
+                hour_dt = hour.astype(datetime)
+                partition = os.path.join(self.directory, f"date={hour_dt:%Y-%m-%d}", f"hour={hour_dt:%H}")
+                os.makedirs(partition, exist_ok=True)
+                self._seq += 1
+                name = f"bets-{stamp}-{self._writer_id}-{os.getpid()}-{self._seq}.{self.fmt}"
+                path = os.path.join(partition, name)
+                paths.append(path)
+                part = {name: values[mask] for name, values in columns.items()}
+                if self.fmt == "parquet":
+                    _write_parquet(f"{path}.tmp", part)
+                else:
+                    _write_npz(f"{path}.tmp", part)
+        except BaseException:
+            for path in paths:
+                if os.path.exists(f"{path}.tmp"):
+                    os.remove(f"{path}.tmp")
+            raise
+        # Readers only glob finished names, so nothing is visible until here
+        for path in paths:
+            os.replace(f"{path}.tmp", path)
+        return paths
+
+    async def run_once(self) -> List[str]:
+        rows = self.collect()
+        if not rows:
+            return []
+        try:
+            paths = await asyncio.to_thread(self.write, rows)
+        except Exception:
+            # Nothing was published; keep the rows, in order, for the next flush
+            self._retry = rows
+            raise
+        self.rows_exported += len(rows)
+        logger.info(f"Exported {len(rows)} bets to {len(paths)} analytics files")
+        return paths
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as exc:
+                logger.error(f"Analytics export failed: {exc}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _write_npz(path: str, columns: Dict) -> None:
+    import numpy as np
+
+    arrays = {}
+    for name, values in columns.items():
+        if values.dtype.kind == "U" and name != "bet_id":
+            # Dictionary-encode low-cardinality strings for compact, scan-friendly files
+            uniques, codes = np.unique(values, return_inverse=True)
+            arrays[f"{name}__dict"] = uniques
+            arrays[f"{name}__codes"] = codes.astype(np.int32)
+        elif values.dtype.kind == "M":
+            arrays[name] = values.astype("datetime64[us]").astype(np.int64)
+        else:
+            arrays[name] = values
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _write_parquet(path: str, columns: Dict) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({
+        name: pa.array(values).dictionary_encode()
+        if values.dtype.kind == "U" and name != "bet_id" else pa.array(values)
+        for name, values in columns.items()
+    })
+    pq.write_table(table, path)
@@ -0,0 +1,138 @@
+"""
+/stats-style aggregates over exported bet-history files
+
+Reads the hour-partitioned files written by analytics_export.py, pruning
+partitions by date from the directory names, and computes totals grouped by
+game_type, user_id or hour with vectorized NumPy scans.
+
+Usage:
+    python analytics_query.py /data/analytics --by game_type --start 2026-10-01 --end 2026-10-07
+"""
+import argparse
+import glob
+import json
+import os
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+
+GROUPINGS = ("game_type", "user_id", "hour")
+
+
+def partition_files(directory: str, start: Optional[date] = None, end: Optional[date] = None):
+    """Files whose date partition falls within [start, end]"""
+    paths = []
+    for partition in sorted(glob.glob(os.path.join(directory, "date=*"))):
+        day = date.fromisoformat(os.path.basename(partition)[len("date="):])
+        if (start and day < start) or (end and day > end):
+            continue
+        paths.extend(sorted(glob.glob(os.path.join(partition, "hour=*", "bets-*.npz"))))
+        paths.extend(sorted(glob.glob(os.path.join(partition, "hour=*", "bets-*.parquet"))))
+    return paths
+
+
+def _read_npz(path: str) -> Dict[str, np.ndarray]:
+    columns = {}
+    with np.load(path) as archive:
+        for name in archive.files:
+            if name.endswith("__codes"):
+                base = name[:-len("__codes")]
+                columns[base] = archive[f"{base}__dict"][archive[name]]
+            elif not name.endswith("__dict"):
+                columns[name] = archive[name]
+    columns["timestamp"] = columns["timestamp"].astype("datetime64[us]")
+    return columns
+
+
+def _read_parquet(path: str) -> Dict[str, np.ndarray]:
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if hasattr(column.type, "value_type"):
+            column = column.cast(column.type.value_type)
+        columns[name] = column.to_numpy()
+    columns["timestamp"] = columns["timestamp"].astype("datetime64[us]")
+    for name in ("bet_id", "user_id", "game_type", "result"):
+        columns[name] = columns[name].astype(str)
+    return columns
+
+
+def load(directory: str, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """Concatenate every column across the selected partitions"""
+    parts = [
+        _read_parquet(path) if path.endswith(".parquet") else _read_npz(path)
+        for path in partition_files(directory, start, end)
+    ]
+    if not parts:
+        return {
+            "user_id": np.array([], dtype=str), "game_type": np.array([], dtype=str),
+            "result": np.array([], dtype=str), "amount": np.array([], dtype=np.float64),
+            "win_amount": np.array([], dtype=np.float64),
+            "timestamp": np.array([], dtype="datetime64[us]"),
+        }
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _summary(bets, wins, wagered, winnings) -> Dict:
+    return {
+        "total_bets": int(bets),
+        "total_wins": int(wins),
+        "total_losses": int(bets - wins),
+        "win_rate": float(wins / bets) if bets > 0 else 0,
+        "total_wagered": float(wagered),
+        "total_winnings": float(winnings),
+        "house_edge": float((wagered - winnings) / wagered) if wagered > 0 else 0,
+    }
+
+
+def stats(columns: Dict[str, np.ndarray]) -> Dict:
+    """Overall totals, matching the API's /stats fields"""
+    result = _summary(
+        len(columns["amount"]),
+        np.count_nonzero(columns["result"] == "win"),
+        columns["amount"].sum(),
+        columns["win_amount"].sum(),
+    )
+    result["active_users"] = int(len(np.unique(columns["user_id"])))
+    return result
+
+
+def aggregate(columns: Dict[str, np.ndarray], by: str = "game_type") -> Dict[str, Dict]:
+    """Totals grouped by game_type, user_id or hour"""
+    if by not in GROUPINGS:
+        raise ValueError(f"Unsupported grouping: {by}")
+    if by == "hour":
+        keys = columns["timestamp"].astype("datetime64[h]").astype(str)
+    else:
+        keys = columns[by]
+    groups, codes = np.unique(keys, return_inverse=True)
+    size = len(groups)
+    bets = np.bincount(codes, minlength=size)
+    wins = np.bincount(codes, weights=columns["result"] == "win", minlength=size)
+    wagered = np.bincount(codes, weights=columns["amount"], minlength=size)
+    winnings = np.bincount(codes, weights=columns["win_amount"], minlength=size)
+    return {
+        str(group): _summary(bets[i], wins[i], wagered[i], winnings[i])
+        for i, group in enumerate(groups)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate exported CryptoSpins bet history")
+    parser.add_argument("directory")
+    parser.add_argument("--by", choices=GROUPINGS)
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    columns = load(args.directory, args.start, args.end)
+    result = aggregate(columns, args.by) if args.by else stats(columns)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for SERVER_MODE=gunicorn
+
+Usage:
+    gunicorn -c gunicorn_conf.py main:app
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from serving import gunicorn_settings  # noqa: E402
+
+_settings = gunicorn_settings()
+bind = _settings["bind"]
+workers = _settings["workers"]
+worker_class = _settings["worker_class"]
+keepalive = _settings["keepalive"]
+backlog = _settings["backlog"]
+max_requests = _settings["max_requests"]
+max_requests_jitter = _settings["max_requests_jitter"]
+graceful_timeout = _settings["graceful_timeout"]
+timeout = _settings["timeout"]
+accesslog = _settings["accesslog"]
@@ -0,0 +1,304 @@
+"""
+Double-entry balance ledger for CryptoSpins
+
+Every balance change is a transfer between two accounts recorded as a debit
+and a credit posting in an append-only journal. Amounts are fixed-point
+integers (micro-units) so balances never drift the way repeated float
+arithmetic does. Per-account balances are materialized as postings are
+appended, so reads are O(1); old postings are periodically folded into a
+checkpoint to bound memory, and reconciliation replays the journal on top
+of the checkpoint to verify the materialized balances.
+"""
+import asyncio
+import logging
+import math
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCALE = 1_000_000
+HOUSE_ACCOUNT = 0
+MAX_AMOUNT = 2 ** 63 - 1  # journal entries are signed 64-bit
+
+
+def to_fixed(amount: float) -> int:
+    """Convert to fixed-point units; raises ValueError if the result can't be journaled"""
+    scaled = amount * SCALE
+    if not math.isfinite(scaled) or abs(scaled) > MAX_AMOUNT:
+        raise ValueError(f"Amount out of range: {amount}")
+    return round(scaled)
+
+
+def from_fixed(amount: int) -> float:
+    return amount / SCALE
+
+
+class LedgerSnapshot:
+    """Point-in-time view of the ledger used for off-loop reconciliation"""
+
+    def __init__(self, checkpoint: List[int], accounts: array, deltas: array, balances: List[int]):
+        self.checkpoint = checkpoint
+        self.accounts = accounts
+        self.deltas = deltas
+        self.balances = balances
+
+
+class ReconciliationResult:
+    """Outcome of replaying the journal against materialized balances"""
+
+    def __init__(self, entries_checked: int, mismatched_accounts: List[int],
+                 balanced: bool, seconds: float):
+        self.entries_checked = entries_checked
+        self.mismatched_accounts = mismatched_accounts
+        self.balanced = balanced
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.balanced and not self.mismatched_accounts
+
+    @property
+    def entries_per_second(self) -> float:
+        return self.entries_checked / self.seconds if self.seconds > 0 else 0.0
+
+
+class Ledger:
+    """In-memory double-entry journal with materialized per-account balances"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._account_ids: Dict[str, int] = {}
+        self._account_names: List[Optional[str]] = [None]
+        self._balances: List[int] = [0]  # index 0 is the house account
+        self._checkpoint: List[int] = [0]
+        self._accounts = array("q")
+        self._deltas = array("q")
+        self._refs: List[Optional[str]] = []
+        self.checkpoint_seq = 0
+
+    # Accounts
+
+    def has_account(self, user_id: str) -> bool:
+        return user_id in self._account_ids
+
+    def open_account(self, user_id: str, starting_balance: int, ref: Optional[str] = None) -> int:
+        """Create a user account funded from the house"""
+        if not 0 <= starting_balance <= MAX_AMOUNT:
+            raise ValueError(f"Starting balance out of range: {starting_balance}")
+        account = len(self._balances)
+        self._account_ids[user_id] = account
+        self._account_names.append(user_id)
+        self._balances.append(0)
+        self._checkpoint.append(0)
+        if starting_balance:
+            self._post(HOUSE_ACCOUNT, account, starting_balance, ref)
+        return account
+
+    def account_id(self, user_id: str) -> int:
+        return self._account_ids[user_id]
+
+    def balance(self, user_id: str) -> int:
+        """Materialized balance of a user account, in fixed-point units"""
+        return self._balances[self._account_ids[user_id]]
+
+    def house_balance(self) -> int:
+        return self._balances[HOUSE_ACCOUNT]
+
+    def user_count(self) -> int:
+        return len(self._account_ids)
+
+    def balances(self, start: int = 1, stop: Optional[int] = None) -> Iterator[Tuple[str, int]]:
+        """User balances by account id; accounts opened after the call are not included"""
+        names, balances = self._account_names, self._balances
+        stop = len(names) if stop is None else stop
+        for account in range(start, stop):
+            yield names[account], balances[account]
+
+    def set_balance(self, user_id: str, amount: int, ref: Optional[str] = None):
+        """Bring a user's balance to `amount` with a transfer to or from the house"""
+        account = self._account_ids.get(user_id)
+        if account is None:
+            self.open_account(user_id, amount, ref)
+            return
+        difference = amount - self._balances[account]
+        if difference > 0:
+            self._post(HOUSE_ACCOUNT, account, difference, ref)
+        elif difference < 0:
+            self._post(account, HOUSE_ACCOUNT, -difference, ref)
+
+    def set_balances(self, records: Iterable[Tuple[str, int]], ref: Optional[str] = None) -> int:
+        """Bulk `set_balance` for imports, posting each adjustment against the house
+
+        Raises ValueError without changing anything if any amount is out of range.
+        """
+        records = list(records)
+        for user_id, amount in records:
+            if not 0 <= amount <= MAX_AMOUNT:
+                raise ValueError(f"Balance out of range for {user_id[:100]}: {amount}")
+        ids, names = self._account_ids, self._account_names
+        balances, checkpoint = self._balances, self._checkpoint
+        accounts, deltas = array("q"), array("q")
+        house_delta = 0
+        count = 0
+        for user_id, amount in records:
+            count += 1
+            account = ids.get(user_id)
+            if account is None:
+                account = len(balances)
+                ids[user_id] = account
+                names.append(user_id)
+                balances.append(amount)
+                checkpoint.append(0)
+                difference = amount
+            else:
+                difference = amount - balances[account]
+                balances[account] = amount
+            if difference > 0:
+                accounts.extend((HOUSE_ACCOUNT, account))
+                deltas.extend((-difference, difference))
+            elif difference < 0:
+                accounts.extend((account, HOUSE_ACCOUNT))
+                deltas.extend((difference, -difference))
+            house_delta -= difference
+        balances[HOUSE_ACCOUNT] += house_delta
+        self._accounts.extend(accounts)
+        self._deltas.extend(deltas)
+        self._refs.extend([ref] * (len(deltas) // 2))
+        return count
+
+    # Postings
+
+    def _post(self, debit: int, credit: int, amount: int, ref: Optional[str]):
+        # Validate before touching anything so a rejected transfer leaves no trace
+        if not 0 <= amount <= MAX_AMOUNT:
+            raise ValueError(f"Transfer amount out of range: {amount}")
+        if self._balances[credit] + amount > MAX_AMOUNT:
+            raise ValueError(f"Transfer would overflow account {credit}")
+        self._accounts.append(debit)
+        self._deltas.append(-amount)
+        self._accounts.append(credit)
+        self._deltas.append(amount)
+        self._refs.append(ref)
+        self._balances[debit] -= amount
+        self._balances[credit] += amount
+
+    def stake(self, user_id: str, amount: int, ref: Optional[str] = None):
+        """Debit the user and credit the house for a wager"""
+        self._post(self._account_ids[user_id], HOUSE_ACCOUNT, amount, ref)
+
+    def payout(self, user_id: str, amount: int, ref: Optional[str] = None):
+        """Debit the house and credit the user for winnings"""
+        self._post(HOUSE_ACCOUNT, self._account_ids[user_id], amount, ref)
+
+    @property
+    def journal_size(self) -> int:
+        return len(self._deltas)
+
+    def entries(self) -> Iterator[Tuple[int, int, Optional[str]]]:
+        """Postings still in the journal as (account, delta, ref)"""
+        refs = self._refs
+        for i, (account, delta) in enumerate(zip(self._accounts, self._deltas)):
+            yield account, delta, refs[i // 2]
+
+    # Maintenance
+
+    def compact(self, retain: int = 0) -> int:
+        """Fold all but the newest `retain` postings into the checkpoint"""
+        accounts, deltas = self.detach(retain)
+        self.fold(accounts, deltas)
+        return len(deltas)
+
+    def detach(self, retain: int = 0) -> Tuple[array, array]:
+        """Cut all but the newest `retain` postings off the journal and return them
+
+        Only the retained tail is copied, so this is cheap however large the
+        journal has grown. The detached postings must be passed to `fold`
+        before the ledger is snapshotted or reconciled again.
+        """
+        fold = self.journal_size - retain
+        fold -= fold % 2  # never split a debit from its credit
+        if fold <= 0:
+            return array("q"), array("q")
+        accounts, deltas = self._accounts, self._deltas
+        self._accounts, self._deltas = accounts[fold:], deltas[fold:]
+        self._refs = self._refs[fold // 2:]
+        self.checkpoint_seq += fold
+        del accounts[fold:]
+        del deltas[fold:]
+        return accounts, deltas
+
+    def fold(self, accounts: array, deltas: array):
+        """Add detached postings to the checkpoint; safe to run in a worker thread,
+        since the event loop only ever appends to the checkpoint"""
+        checkpoint = self._checkpoint
+        for account, delta in zip(accounts, deltas):
+            checkpoint[account] += delta
+
+    def snapshot(self) -> LedgerSnapshot:
+        """Copy the journal and balances; the checkpoint is shared rather than copied
+        because outside of `fold` existing checkpoint entries never change"""
+        return LedgerSnapshot(self._checkpoint, array("q", self._accounts),
+                              array("q", self._deltas), list(self._balances))
+
+    def reconcile(self, snapshot: Optional[LedgerSnapshot] = None) -> ReconciliationResult:
+        """Replay journal postings on the checkpoint and compare with materialized balances"""
+        snapshot = snapshot or self.snapshot()
+        start = time.perf_counter()
+        totals = snapshot.checkpoint[:len(snapshot.balances)]
+        for account, delta in zip(snapshot.accounts, snapshot.deltas):
+            totals[account] += delta
+        balanced = sum(snapshot.deltas) == 0 and sum(totals) == 0
+        mismatched = [
+            account for account, (expected, actual) in enumerate(zip(totals, snapshot.balances))
+            if expected != actual
+        ]
+        return ReconciliationResult(len(snapshot.deltas), mismatched, balanced,
+                                    time.perf_counter() - start)
+
+
+class LedgerCompactor:
+    """Background task that compacts the journal and reconciles it off the event loop"""
+
+    def __init__(self, ledger: Ledger, interval_seconds: float = 30.0, retain: int = 100_000):
+        self.ledger = ledger
+        self.interval_seconds = interval_seconds
+        self.retain = retain
+        self.last_result: Optional[ReconciliationResult] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> ReconciliationResult:
+        # Only the cheap detach and snapshot copies run on the loop; folding and
+        # replaying millions of postings happen in a worker thread
+        accounts, deltas = self.ledger.detach(self.retain)
+        await asyncio.to_thread(self.ledger.fold, accounts, deltas)
+        result = await asyncio.to_thread(self.ledger.reconcile, self.ledger.snapshot())
+        if not result.ok:
+            logger.error(f"Ledger reconciliation failed: balanced={result.balanced}, "
+                         f"mismatched accounts={result.mismatched_accounts[:10]}")
+        self.last_result = result
+        return result
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as exc:
+                logger.error(f"Ledger maintenance failed: {exc}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,161 @@
+"""
+Responsible-gambling limits for CryptoSpins
+
+Each user gets a rolling 24-hour net loss and a wager count for the current
+hour, kept in 24 hourly buckets that expire as the clock advances. Buckets
+are only touched when a user bets, so checking a limit never scans
+bet_history and costs O(1) regardless of how much the user has played.
+Windows are kept in least-recently-used order and a lookup evicts up to two
+that have been idle for a whole window, so memory tracks the users active in
+the last day rather than everyone who ever bet. `check` hands its window to
+`record`, so a bet resolves the user's window once.
+"""
+import os
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+WINDOW_HOURS = 24
+
+_EMPTY = array("q", bytes(8 * WINDOW_HOURS))
+
+DAILY_LOSS = "daily_loss"
+HOURLY_WAGERS = "hourly_wagers"
+
+
+class LimitExceeded(Exception):
+    """Raised when a wager would breach a configured limit"""
+
+    def __init__(self, limit: str, detail: str):
+        super().__init__(detail)
+        self.limit = limit
+        self.detail = detail
+
+
+class LimitConfig:
+    """Per-user limits; a limit of 0 disables it"""
+
+    def __init__(self, daily_net_loss: int = 0, hourly_wagers: int = 0):
+        self.daily_net_loss = daily_net_loss
+        self.hourly_wagers = hourly_wagers
+
+    @classmethod
+    def from_env(cls, to_fixed: Callable[[float], int]) -> "LimitConfig":
+        return cls(
+            daily_net_loss=to_fixed(float(os.getenv("LIMIT_DAILY_NET_LOSS", "5000"))),
+            hourly_wagers=int(os.getenv("LIMIT_HOURLY_WAGERS", "600")),
+        )
+
+
+class UserWindow:
+    """Hourly net-loss buckets plus running totals for one user"""
+
+    __slots__ = ("hour", "net_loss", "wagers", "buckets")
+
+    def __init__(self, hour: int):
+        self.hour = hour
+        self.net_loss = 0
+        self.wagers = 0
+        self.buckets = array("q", _EMPTY)
+
+    def advance(self, hour: int):
+        """Expire buckets that have fallen out of the 24h window"""
+        elapsed = hour - self.hour
+        if elapsed <= 0:
+            return
+        self.wagers = 0
+        buckets = self.buckets
+        if elapsed >= WINDOW_HOURS:
+            buckets[:] = _EMPTY
+            self.net_loss = 0
+        else:
+            # Clear the expired slots with slice operations rather than an hour-by-hour loop
+            start = (self.hour + 1) % WINDOW_HOURS
+            stop = start + elapsed
+            if stop <= WINDOW_HOURS:
+                self.net_loss -= sum(buckets[start:stop])
+                buckets[start:stop] = _EMPTY[:elapsed]
+            else:
+                stop -= WINDOW_HOURS
+                self.net_loss -= sum(buckets[start:]) + sum(buckets[:stop])
+                buckets[start:] = _EMPTY[start:]
+                buckets[:stop] = _EMPTY[:stop]
+        self.hour = hour
+
+
+class LimitsEngine:
+    """Enforces daily net-loss and hourly wager-count limits per user"""
+
+    def __init__(self, config: LimitConfig, clock: Callable[[], float] = time.time):
+        self.config = config
+        self.clock = clock
+        self.rejections: Dict[str, int] = {DAILY_LOSS: 0, HOURLY_WAGERS: 0}
+        self._windows: "OrderedDict[str, UserWindow]" = OrderedDict()
+        # Hours only grow from the cold end of the LRU order to the hot end, so
+        # nothing can be idle before the current oldest window expires
+        self._next_eviction_hour = 0
+
+    def _window(self, user_id: str) -> UserWindow:
+        hour = int(self.clock() // 3600)
+        windows = self._windows
+        window = windows.get(user_id)
+        if window is None:
+            window = windows[user_id] = UserWindow(hour)
+        else:
+            if window.hour != hour:
+                window.advance(hour)
+            windows.move_to_end(user_id)
+        if hour >= self._next_eviction_hour:
+            self._evict_idle(hour)
+        return window
+
+    def _evict_idle(self, hour: int, batch: int = 2):
+        """Drop the least recently used windows once every bucket in them has expired"""
+        windows = self._windows
+        for _ in range(batch):
+            user_id = next(iter(windows))
+            oldest = windows[user_id]
+            if hour - oldest.hour < WINDOW_HOURS:
+                self._next_eviction_hour = oldest.hour + WINDOW_HOURS
+                return
+            del windows[user_id]
+
+    def check(self, user_id: str, stake: int) -> UserWindow:
+        """Raise LimitExceeded if this stake could breach a limit; returns the
+        user's window to pass on to `record`"""
+        window = self._window(user_id)
+        config = self.config
+        if config.hourly_wagers and window.wagers >= config.hourly_wagers:
+            self.rejections[HOURLY_WAGERS] += 1
+            raise LimitExceeded(HOURLY_WAGERS, "Hourly wager limit reached")
+        if config.daily_net_loss and window.net_loss + stake > config.daily_net_loss:
+            self.rejections[DAILY_LOSS] += 1
+            raise LimitExceeded(DAILY_LOSS, "Daily loss limit reached")
+        return window
+
+    def record(self, user_id: str, stake: int, payout: int, window: Optional[UserWindow] = None):
+        """Count a settled wager against the user's windows"""
+        if window is None:
+            window = self._window(user_id)
+        net = stake - payout
+        window.buckets[window.hour % WINDOW_HOURS] += net
+        window.net_loss += net
+        window.wagers += 1
+
+    def usage(self, user_id: str) -> Optional[UserWindow]:
+        window = self._windows.get(user_id)
+        if window is not None:
+            window.advance(int(self.clock() // 3600))
+            self._windows.move_to_end(user_id)
+        return window
+
+    @property
+    def tracked_users(self) -> int:
+        return len(self._windows)
+
+    def reset(self):
+        self._windows.clear()
+        self._next_eviction_hour = 0
+        for limit in self.rejections:
+            self.rejections[limit] = 0
@@ -0,0 +1,84 @@
+"""
+Autoscaling-grade load metrics for CryptoSpins API pods
+
+The HPA should scale on how much work a pod is doing, not on memory held by
+in-memory state. Requests are counted per route in one-second buckets over a
+short sliding window so recording is O(1) and reading is O(window).
+"""
+import time
+from typing import Callable, Dict, List, Tuple
+
+RouteKey = Tuple[str, str]
+
+
+class RequestRateWindow:
+    """Per-route request counts in a ring of one-second buckets"""
+
+    def __init__(self, window_seconds: int = 10, clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._counts: Dict[RouteKey, List[int]] = {}
+        self._epochs: Dict[RouteKey, List[int]] = {}
+
+    def record(self, method: str, route: str):
+        key = (method, route)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * self.window_seconds
+            self._epochs[key] = [-1] * self.window_seconds
+        epochs = self._epochs[key]
+        second = int(self.clock())
+        slot = second % self.window_seconds
+        if epochs[slot] != second:
+            epochs[slot] = second
+            counts[slot] = 0
+        counts[slot] += 1
+
+    def rate(self, method: str, route: str) -> float:
+        """Average requests per second for one route over the window"""
+        key = (method, route)
+        if key not in self._counts:
+            return 0.0
+        oldest = int(self.clock()) - self.window_seconds
+        total = sum(
+            count for count, epoch in zip(self._counts[key], self._epochs[key])
+            if epoch > oldest
+        )
+        return total / self.window_seconds
+
+    def rates(self) -> Dict[RouteKey, float]:
+        return {key: self.rate(*key) for key in self._counts}
+
+    def reset(self):
+        self._counts.clear()
+        self._epochs.clear()
+
+
+class RequestRateMiddleware:
+    """Pure ASGI middleware recording completed requests by route template"""
+
+    def __init__(self, app, window: RequestRateWindow):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router stores the matched route on the scope; unmatched paths are not
+            # recorded so arbitrary URLs can't blow up label cardinality
+            route = scope.get("route")
+            if route is not None:
+                self.window.record(scope["method"], route.path)
+
+
+def excess_concurrency(in_flight: int, target_concurrency: int) -> int:
+    """Requests in flight beyond what the pod is sized to serve concurrently
+
+    Not a queue depth: every accepted request is already being served on the
+    event loop, this only says by how much concurrency exceeds the target.
+    """
+    return max(0, in_flight - target_concurrency)
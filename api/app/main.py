@@ -1,17 +1,35 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import PlainTextResponse
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, Header, HTTPException, Path, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Dict, Optional
+import hmac
+import os
 import uuid
 import time
 import random
 from datetime import datetime
 import logging
 
+from analytics_export import BetExporter
+from ledger import MAX_AMOUNT, Ledger, LedgerCompactor, from_fixed, to_fixed
+from limits import LimitConfig, LimitExceeded, LimitsEngine
+from load_metrics import RequestRateMiddleware, RequestRateWindow, excess_concurrency
+from saturation import InFlightMiddleware, SaturationMonitor, SaturationThresholds
+from snapshot import (
+    FORMATS, MAX_USER_ID_LENGTH, MEDIA_TYPES, BalanceDecoder, SnapshotFormatError, aiter_chunks,
+    encode_balances, encode_bets, import_balances,
+)
+from warmup import WarmupState, run_warmup
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Startup-optimized mode: pre-build schemas at import and warm routes before readiness
+STARTUP_OPTIMIZED = os.getenv("STARTUP_OPTIMIZED", "true").lower() == "true"
+WARMUP_USER_ID = "__warmup__"
+warmup_state = WarmupState()
+
 app = FastAPI(
     title="CryptoSpins API",
     description="A crypto-enabled gaming backend API for high-stakes spinning action",
@@ -19,12 +37,61 @@ app = FastAPI(
 )
 
 # In-memory storage (in production, use Redis/Database)
-user_balances: Dict[str, float] = {}
+ledger = Ledger()
 bet_history: Dict[str, Dict] = {}
+STARTING_BALANCE = to_fixed(1000.0)
+
+# Responsible-gambling limits checked in O(1) before each stake
+limits = LimitsEngine(LimitConfig.from_env(to_fixed))
+
+# Running totals so /stats stays correct once bets are exported out of bet_history
+bet_totals: Dict[str, float] = {}
+
+def reset_bet_totals():
+    bet_totals.update(total_bets=0, total_wins=0, total_wagered=0.0, total_winnings=0.0)
+
+reset_bet_totals()
+
+# Settled bets older than the retention window are flushed to columnar files for reporting
+ANALYTICS_EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR")
+bet_exporter = BetExporter(
+    bet_history,
+    ANALYTICS_EXPORT_DIR or "",
+    interval_seconds=float(os.getenv("ANALYTICS_EXPORT_INTERVAL_SECONDS", "60")),
+    retain_seconds=float(os.getenv("ANALYTICS_RETAIN_SECONDS", "3600")),
+)
+
+# Periodic journal compaction and reconciliation
+ledger_compactor = LedgerCompactor(
+    ledger,
+    interval_seconds=float(os.getenv("LEDGER_COMPACTION_INTERVAL_SECONDS", "30")),
+    retain=int(os.getenv("LEDGER_RETAIN_ENTRIES", "100000")),
+)
+
+# Admin endpoints (bulk export/import) are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "10000"))
+# Worker count published by serving.py; each worker holds only its own users' state
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY") or "1")
+if SERVER_WORKERS > 1 and (limits.config.daily_net_loss or limits.config.hourly_wagers):
+    logger.warning(f"Limits are tracked per worker: with {SERVER_WORKERS} workers a user can "
+                   f"reach up to {SERVER_WORKERS}x the configured loss and wager limits")
+
+# Background saturation checks backing the readiness probe
+saturation_monitor = SaturationMonitor(
+    SaturationThresholds.from_env(),
+    interval_seconds=float(os.getenv("READINESS_CHECK_INTERVAL_SECONDS", "0.5")),
+)
+app.add_middleware(InFlightMiddleware, monitor=saturation_monitor)
+
+# Short-window request rates exported for request-rate-based autoscaling
+request_rates = RequestRateWindow(int(os.getenv("AUTOSCALE_RATE_WINDOW_SECONDS", "10")))
+AUTOSCALE_TARGET_CONCURRENCY = int(os.getenv("AUTOSCALE_TARGET_CONCURRENCY", "50"))
+app.add_middleware(RequestRateMiddleware, window=request_rates)
 
 # Pydantic models
 class BetRequest(BaseModel):
-    user_id: str
+    user_id: str = Field(max_length=MAX_USER_ID_LENGTH)
     amount: float
     game_type: str = "slots"
     multiplier: Optional[float] = 2.0
@@ -57,17 +124,35 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/livez")
+async def liveness_check():
+    """Liveness probe - the process is up and the event loop is answering"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe - ready once warmed up and while the pod is not saturated"""
+    # Uvicorn only binds after startup, so warming_up is only seen by in-process clients
+    if not warmup_state.warm:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    if not saturation_monitor.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "saturated", "reasons": saturation_monitor.reasons}
+        )
+    return {"status": "ready", "warmup_seconds": warmup_state.duration_seconds}
+
 @app.get("/balance/{user_id}", response_model=BalanceResponse)
-async def get_balance(user_id: str):
+async def get_balance(user_id: str = Path(max_length=MAX_USER_ID_LENGTH)):
     """Get user balance"""
-    if user_id not in user_balances:
+    if not ledger.has_account(user_id):
         # Initialize new user with starting balance
-        user_balances[user_id] = 1000.0
+        ledger.open_account(user_id, STARTING_BALANCE)
         logger.info(f"New user {user_id} initialized with balance: 1000.0")
     
     return BalanceResponse(
         user_id=user_id,
-        balance=user_balances[user_id],
+        balance=from_fixed(ledger.balance(user_id)),
         last_updated=datetime.utcnow().isoformat()
     )
 
@@ -76,38 +161,68 @@ async def place_bet(bet_request: BetRequest):
     """Place a bet"""
     user_id = bet_request.user_id
     amount = bet_request.amount
+    multiplier = bet_request.multiplier
     
     # Validate amount
-    if amount <= 0:
+    if not amount > 0:
         raise HTTPException(status_code=400, detail="Bet amount must be positive")
+    if multiplier is None or not multiplier > 0:
+        raise HTTPException(status_code=400, detail="Multiplier must be positive")
+    
+    # Price the stake and any payout up front so nothing can fail once money moves
+    try:
+        stake = to_fixed(amount)
+        if stake <= 0:
+            raise HTTPException(status_code=400, detail="Bet amount is below the minimum of 0.000001")
+        # Record exactly what the ledger takes, not the unrounded request amount
+        amount = from_fixed(stake)
+        payout = to_fixed(amount * multiplier)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Bet amount or multiplier out of range")
     
     # Initialize user balance if not exists
-    if user_id not in user_balances:
-        user_balances[user_id] = 1000.0
+    if not ledger.has_account(user_id):
+        ledger.open_account(user_id, STARTING_BALANCE)
     
     # Check sufficient balance
-    if user_balances[user_id] < amount:
+    balance = ledger.balance(user_id)
+    if balance < stake:
         raise HTTPException(status_code=400, detail="Insufficient balance")
+    if balance - stake + payout > MAX_AMOUNT:
+        raise HTTPException(status_code=400, detail="Bet amount or multiplier out of range")
+    
+    # Enforce loss and wager limits before any money moves
+    try:
+        limit_window = limits.check(user_id, stake)
+    except LimitExceeded as exc:
+        logger.info(f"User {user_id} bet rejected: {exc.detail}")
+        raise HTTPException(status_code=403, detail=exc.detail)
     
     # Deduct bet amount
-    user_balances[user_id] -= amount
+    bet_id = str(uuid.uuid4())
+    ledger.stake(user_id, stake, bet_id)
     
     # Simulate game result (30% win rate for high stakes!)
-    bet_id = str(uuid.uuid4())
     win_probability = 0.3
     won = random.random() < win_probability
     
     if won:
-        win_amount = amount * bet_request.multiplier
-        user_balances[user_id] += win_amount
+        ledger.payout(user_id, payout, bet_id)
+        win_amount = from_fixed(payout)
         result = "win"
         logger.info(f"User {user_id} won {win_amount} with bet {bet_id}")
     else:
+        payout = 0
         win_amount = 0
         result = "loss"
         logger.info(f"User {user_id} lost {amount} with bet {bet_id}")
+    limits.record(user_id, stake, payout, limit_window)
     
     # Store bet history
+    bet_totals["total_bets"] += 1
+    bet_totals["total_wins"] += won
+    bet_totals["total_wagered"] += amount
+    bet_totals["total_winnings"] += win_amount
     bet_history[bet_id] = {
         "user_id": user_id,
         "amount": amount,
@@ -137,11 +252,11 @@ async def get_bet_details(bet_id: str):
 @app.get("/stats")
 async def get_stats():
     """Get overall gaming statistics"""
-    total_bets = len(bet_history)
-    total_wins = sum(1 for bet in bet_history.values() if bet["result"] == "win")
+    total_bets = bet_totals["total_bets"]
+    total_wins = bet_totals["total_wins"]
     total_losses = total_bets - total_wins
-    total_wagered = sum(bet["amount"] for bet in bet_history.values())
-    total_winnings = sum(bet["win_amount"] for bet in bet_history.values())
+    total_wagered = bet_totals["total_wagered"]
+    total_winnings = bet_totals["total_winnings"]
     
     return {
         "total_bets": total_bets,
@@ -151,9 +266,61 @@ async def get_stats():
         "total_wagered": total_wagered,
         "total_winnings": total_winnings,
         "house_edge": (total_wagered - total_winnings) / total_wagered if total_wagered > 0 else 0,
-        "active_users": len(user_balances)
+        "active_users": ledger.user_count()
     }
 
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Guard for admin endpoints"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    # Constant-time comparison so response timing doesn't leak the token
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    if SERVER_WORKERS > 1:
+        # Exports and imports would only cover the worker that took the connection
+        raise HTTPException(
+            status_code=409,
+            detail=f"Admin endpoints need a single worker, {SERVER_WORKERS} are running; set WEB_CONCURRENCY=1"
+        )
+
+def _check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+
+@app.get("/admin/export/balances", dependencies=[Depends(require_admin)])
+async def export_balances(format: str = "ndjson"):
+    """Stream every user balance as NDJSON or the compact binary format"""
+    _check_format(format)
+    return StreamingResponse(
+        aiter_chunks(encode_balances(ledger, format, SNAPSHOT_CHUNK_SIZE)),
+        media_type=MEDIA_TYPES[format]
+    )
+
+@app.get("/admin/export/bets", dependencies=[Depends(require_admin)])
+async def export_bets():
+    """Stream bet history as NDJSON"""
+    return StreamingResponse(
+        aiter_chunks(encode_bets(bet_history, SNAPSHOT_CHUNK_SIZE)),
+        media_type=MEDIA_TYPES["ndjson"]
+    )
+
+@app.post("/admin/import/balances", dependencies=[Depends(require_admin)])
+async def import_balances_endpoint(request: Request, format: str = "ndjson"):
+    """Bulk-load balances from a streamed NDJSON or binary request body"""
+    _check_format(format)
+    decoder = BalanceDecoder(format)
+    imported = 0
+    start = time.perf_counter()
+    try:
+        async for chunk in request.stream():
+            imported += import_balances(ledger, decoder.feed(chunk))
+        imported += import_balances(ledger, decoder.close())
+    except SnapshotFormatError as exc:
+        raise HTTPException(status_code=400, detail=f"{exc} (after {imported} users imported)")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Imported {imported} balances in {elapsed:.2f}s")
+    return {"imported": imported, "seconds": elapsed}
+
 @app.get("/metrics", response_class=PlainTextResponse)
 async def get_metrics():
     """Prometheus-style metrics endpoint"""
@@ -168,10 +335,91 @@ async def get_metrics():
         f'cryptospins_total_winnings {stats["total_winnings"]}',
         f'cryptospins_house_edge {stats["house_edge"]}',
         f'cryptospins_active_users {stats["active_users"]}',
+        f'cryptospins_ledger_journal_entries {ledger.journal_size}',
+        f'cryptospins_ledger_checkpoint_entries {ledger.checkpoint_seq}',
     ]
+    metrics.append(f'cryptospins_analytics_exported_bets {bet_exporter.rows_exported}')
+    for limit, count in limits.rejections.items():
+        metrics.append(f'cryptospins_limit_rejections_total{{limit="{limit}"}} {count}')
+    metrics.append(f'cryptospins_limit_tracked_users {limits.tracked_users}')
+    if ledger_compactor.last_result is not None:
+        metrics.append(f'cryptospins_ledger_reconciliation_ok {int(ledger_compactor.last_result.ok)}')
+    metrics.extend(_autoscaling_metrics())
     
     return "\n".join(metrics)
 
+def _autoscaling_metrics():
+    """Saturation gauges the HPA can scale on via a Prometheus adapter"""
+    in_flight = saturation_monitor.in_flight
+    metrics = [
+        f'cryptospins_in_flight_requests {in_flight}',
+        f'cryptospins_excess_concurrency {excess_concurrency(in_flight, AUTOSCALE_TARGET_CONCURRENCY)}',
+        f'cryptospins_event_loop_utilization {saturation_monitor.loop_utilization}',
+        f'cryptospins_event_loop_lag_seconds {saturation_monitor.loop_lag_ms / 1000}',
+        f'cryptospins_bets_per_second {request_rates.rate("POST", "/bet")}',
+    ]
+    for (method, route), rate in sorted(request_rates.rates().items()):
+        metrics.append(f'cryptospins_requests_per_second{{method="{method}",route="{route}"}} {rate}')
+    return metrics
+
+def _purge_warmup_state():
+    """Remove any state created by warmup requests"""
+    # The journal is append-only, but nothing except warmup has touched it yet:
+    # the server does not accept connections until startup has completed
+    ledger.reset()
+    bet_history.clear()
+    reset_bet_totals()
+    limits.reset()
+    request_rates.reset()
+
+@app.on_event("startup")
+async def warm_up():
+    """Exercise the hot routes before the readiness probe reports ready"""
+    if not STARTUP_OPTIMIZED:
+        warmup_state.mark_warm(0.0)
+        return
+    try:
+        elapsed = await run_warmup(app, [
+            ("GET", f"/balance/{WARMUP_USER_ID}", None),
+            ("POST", "/bet", {"user_id": WARMUP_USER_ID, "amount": 1.0, "game_type": "slots", "multiplier": 2.0}),
+            ("GET", "/stats", None),
+        ])
+    finally:
+        _purge_warmup_state()
+    warmup_state.mark_warm(elapsed)
+
+@app.on_event("startup")
+async def start_saturation_monitor():
+    """Start sampling saturation signals for the readiness probe"""
+    saturation_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_saturation_monitor():
+    await saturation_monitor.stop()
+
+@app.on_event("startup")
+async def start_ledger_compactor():
+    """Start periodic ledger compaction and reconciliation"""
+    ledger_compactor.start()
+
+@app.on_event("shutdown")
+async def stop_ledger_compactor():
+    await ledger_compactor.stop()
+
+@app.on_event("startup")
+async def start_bet_exporter():
+    """Start flushing settled bets to columnar files when an export directory is set"""
+    if ANALYTICS_EXPORT_DIR:
+        bet_exporter.start()
+
+@app.on_event("shutdown")
+async def stop_bet_exporter():
+    await bet_exporter.stop()
+
+if STARTUP_OPTIMIZED:
+    # Build the OpenAPI schema now rather than on the first /docs or /openapi.json hit
+    app.openapi()
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    from serving import run
+    run()
\ No newline at end of file
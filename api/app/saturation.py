@@ -0,0 +1,108 @@
+"""
+Saturation monitoring for CryptoSpins API readiness
+
+Readiness should go unready when the pod can no longer serve new traffic,
+not only once requests are already timing out. A background task samples
+event-loop lag and in-flight request count, and the readiness probe just
+reads the last verdict so it never queues behind bets. Balances live in
+process memory, so there is no storage round trip worth probing; add one
+here once state moves to an external store.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SaturationThresholds:
+    """Configurable limits beyond which the pod reports unready"""
+
+    def __init__(self, max_loop_lag_ms: float = 250.0, max_in_flight: int = 200):
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_in_flight = max_in_flight
+
+    @classmethod
+    def from_env(cls) -> "SaturationThresholds":
+        return cls(
+            max_loop_lag_ms=float(os.getenv("READINESS_MAX_LOOP_LAG_MS", "250")),
+            max_in_flight=int(os.getenv("READINESS_MAX_IN_FLIGHT", "200")),
+        )
+
+
+class InFlightMiddleware:
+    """Pure ASGI middleware counting HTTP requests currently being served"""
+
+    def __init__(self, app, monitor: "SaturationMonitor"):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.monitor.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.in_flight -= 1
+
+
+class SaturationMonitor:
+    """Samples saturation signals in the background and caches a readiness verdict"""
+
+    def __init__(self, thresholds: SaturationThresholds, interval_seconds: float = 0.5):
+        self.thresholds = thresholds
+        self.interval_seconds = interval_seconds
+        self.in_flight = 0
+        self.loop_lag_ms = 0.0
+        self.loop_utilization = 0.0
+        self.ready = True
+        self.reasons: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def evaluate(self):
+        """Recompute the readiness verdict from the latest samples"""
+        reasons = []
+        if self.loop_lag_ms > self.thresholds.max_loop_lag_ms:
+            reasons.append(f"event loop lag {self.loop_lag_ms:.1f}ms")
+        if self.in_flight > self.thresholds.max_in_flight:
+            reasons.append(f"{self.in_flight} requests in flight")
+        if reasons and self.ready:
+            logger.warning(f"Pod saturated, reporting unready: {', '.join(reasons)}")
+        self.ready = not reasons
+        self.reasons = reasons
+
+    async def run(self):
+        """Sampling loop - loop lag is how late the periodic sleep wakes up, and loop
+        utilization is the share of wall time the loop thread spent on CPU"""
+        while True:
+            start = time.perf_counter()
+            cpu_start = time.thread_time()
+            await asyncio.sleep(self.interval_seconds)
+            elapsed = time.perf_counter() - start
+            self.loop_lag_ms = max(0.0, (elapsed - self.interval_seconds) * 1000)
+            self.loop_utilization = min(1.0, (time.thread_time() - cpu_start) / elapsed)
+            self.evaluate()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        self.in_flight = 0
+        self.loop_lag_ms = 0.0
+        self.loop_utilization = 0.0
+        self.ready = True
+        self.reasons = []
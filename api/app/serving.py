@@ -0,0 +1,114 @@
+"""
+Production serving profile for the CryptoSpins API
+
+Sizes the worker pool from the container's CPU quota rather than the node's
+core count, pins uvloop and httptools, and tunes keep-alive and backlog.
+SERVER_MODE=gunicorn runs the same uvicorn workers under Gunicorn.
+
+Balances, limits and bet history live in each worker's memory, so every
+worker has its own copy and a recycled worker starts empty. Gunicorn's
+max_requests recycling is therefore off unless MAX_REQUESTS is set, and
+setting it logs a warning; only enable it once state lives outside the
+process.
+
+Usage:
+    python serving.py
+"""
+import logging
+import math
+import os
+import sys
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota(cpu_max_path: str = CGROUP_V2_CPU_MAX, quota_path: str = CGROUP_V1_QUOTA,
+              period_path: str = CGROUP_V1_PERIOD) -> float:
+    """CPUs available to this container, from the cgroup quota when one is set"""
+    cpu_max = _read(cpu_max_path)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+    quota, period = _read(quota_path), _read(period_path)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return float(os.cpu_count() or 1)
+
+
+def worker_count(quota: Optional[float] = None) -> int:
+    """One worker per whole CPU of quota; WEB_CONCURRENCY overrides"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    quota = cpu_quota() if quota is None else quota
+    return max(1, math.floor(quota))
+
+
+def uvicorn_config() -> Dict[str, Any]:
+    """Keyword arguments for uvicorn.run in the production profile"""
+    return {
+        "host": os.getenv("HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT", "8000")),
+        "workers": worker_count(),
+        "loop": "uvloop",
+        "http": "httptools",
+        # Longer than the load balancer's idle timeout so the server never closes first
+        "timeout_keep_alive": int(os.getenv("KEEP_ALIVE_SECONDS", "65")),
+        "backlog": int(os.getenv("BACKLOG", "2048")),
+        "proxy_headers": True,
+        "access_log": os.getenv("ACCESS_LOG", "false").lower() == "true",
+    }
+
+
+def gunicorn_settings() -> Dict[str, Any]:
+    """Gunicorn settings for a managed pool of uvicorn workers"""
+    config = uvicorn_config()
+    max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+    if max_requests:
+        logger.warning(f"MAX_REQUESTS={max_requests}: each recycled worker discards "
+                       "the balances, limits and bet history held in its memory")
+    return {
+        "bind": f"{config['host']}:{config['port']}",
+        "workers": config["workers"],
+        "worker_class": "uvicorn_worker.TunedUvicornWorker",
+        "keepalive": config["timeout_keep_alive"],
+        "backlog": config["backlog"],
+        # Recycling wipes in-memory state, so it is opt-in; jitter keeps workers
+        # from restarting together when it is enabled
+        "max_requests": max_requests,
+        "max_requests_jitter": int(os.getenv("MAX_REQUESTS_JITTER", str(max_requests // 10))),
+        "graceful_timeout": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "timeout": int(os.getenv("WORKER_TIMEOUT", "60")),
+        "accesslog": "-" if config["access_log"] else None,
+    }
+
+
+def run():
+    mode = os.getenv("SERVER_MODE", "uvicorn")
+    if mode not in ("uvicorn", "gunicorn"):
+        sys.exit(f"Unknown SERVER_MODE: {mode}")
+    # Publish the resolved count so workers can tell whether they hold all of the state
+    os.environ["WEB_CONCURRENCY"] = str(worker_count())
+    if mode == "gunicorn":
+        conf = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn_conf.py")
+        os.execvp("gunicorn", ["gunicorn", "-c", conf, "main:app"])
+    else:
+        import uvicorn
+        uvicorn.run("main:app", **uvicorn_config())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,13 @@
+"""
+Gunicorn worker class for SERVER_MODE=gunicorn
+
+uvicorn's stock UvicornWorker picks its event loop and HTTP parser with
+loop="auto" and http="auto", which silently falls back to asyncio and h11
+if uvloop or httptools fail to import. This worker pins both, matching the
+uvicorn profile in serving.py, so a broken install fails at boot instead.
+"""
+from uvicorn.workers import UvicornWorker
+
+
+class TunedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
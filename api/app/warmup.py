@@ -0,0 +1,85 @@
+"""
+Startup warmup for CryptoSpins API pods
+
+New pods only take traffic once the readiness probe passes, so the first
+requests after an HPA scale-up should not pay for lazy route, validator and
+serializer setup. The warmup drives a handful of requests through the full
+ASGI stack in-process before the pod reports ready.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WarmupRequest = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class WarmupState:
+    """Tracks whether the process has finished warming up"""
+
+    def __init__(self):
+        self.warm = False
+        self.duration_seconds: Optional[float] = None
+
+    def mark_warm(self, duration_seconds: float):
+        self.warm = True
+        self.duration_seconds = duration_seconds
+
+    def reset(self):
+        self.warm = False
+        self.duration_seconds = None
+
+
+async def asgi_request(app, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> int:
+    """Send a single in-process HTTP request to an ASGI app and return its status code"""
+    payload = json.dumps(body).encode() if body is not None else b""
+    headers = [(b"host", b"warmup")]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(payload)).encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 8000),
+    }
+    request_sent = False
+    status = {"code": 500}
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            return {"type": "http.disconnect"}
+        request_sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status["code"]
+
+
+async def run_warmup(app, requests: List[WarmupRequest], rounds: int = 3) -> float:
+    """Exercise the given requests against the app and return the elapsed seconds"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for method, path, body in requests:
+            code = await asgi_request(app, method, path, body)
+            if code >= 500:
+                logger.warning(f"Warmup request {method} {path} returned {code}")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Warmup completed in {elapsed * 1000:.1f}ms")
+    return elapsed
@@ -0,0 +1,76 @@
+"""
+Ledger benchmark for the CryptoSpins API
+
+Measures posting throughput, compaction and reconciliation speed over a
+journal of synthetic bets.
+
+Usage:
+    python benchmarks/ledger_bench.py [--users 100000] [--bets 2000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from ledger import Ledger, to_fixed  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--bets", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    ledger = Ledger()
+    users = [f"user-{i}" for i in range(args.users)]
+    start = time.perf_counter()
+    for user_id in users:
+        ledger.open_account(user_id, to_fixed(1000.0))
+    elapsed = time.perf_counter() - start
+    print(f"open accounts:   {args.users:>10,} in {elapsed:6.3f}s ({args.users / elapsed:,.0f}/s)")
+
+    rng = random.Random(42)
+    stake = to_fixed(1.0)
+    payout = to_fixed(2.0)
+    start = time.perf_counter()
+    for i in range(args.bets):
+        user_id = users[i % args.users]
+        ledger.stake(user_id, stake)
+        if rng.random() < 0.3:
+            ledger.payout(user_id, payout)
+    elapsed = time.perf_counter() - start
+    print(f"place bets:      {args.bets:>10,} in {elapsed:6.3f}s ({args.bets / elapsed:,.0f}/s)")
+
+    entries = ledger.journal_size
+    start = time.perf_counter()
+    snapshot = ledger.snapshot()
+    print(f"snapshot:        {entries:>10,} entries in {time.perf_counter() - start:6.3f}s")
+
+    result = ledger.reconcile(snapshot)
+    print(f"reconcile:       {result.entries_checked:>10,} entries in {result.seconds:6.3f}s "
+          f"({result.entries_per_second:,.0f} entries/s, ok={result.ok})")
+
+    # detach is the only part of compaction the event loop waits for; fold runs in a thread
+    start = time.perf_counter()
+    accounts, deltas = ledger.detach(retain=100_000)
+    print(f"detach:          {len(deltas):>10,} entries in {time.perf_counter() - start:6.3f}s (on loop)")
+
+    start = time.perf_counter()
+    ledger.fold(accounts, deltas)
+    elapsed = time.perf_counter() - start
+    folded = len(deltas)
+    print(f"fold:            {folded:>10,} entries in {elapsed:6.3f}s ({folded / elapsed:,.0f} entries/s)")
+
+    start = time.perf_counter()
+    ledger.snapshot()
+    print(f"snapshot after:  {ledger.journal_size:>10,} entries in {time.perf_counter() - start:6.3f}s (on loop)")
+
+    result = ledger.reconcile()
+    print(f"reconcile after: {result.entries_checked:>10,} entries in {result.seconds:6.3f}s (ok={result.ok})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Limits engine benchmark for the CryptoSpins API
+
+Measures the cost the responsible-gambling check and window update add to
+each bet, across many users and with the clock crossing hour boundaries.
+
+Usage:
+    python benchmarks/limits_bench.py [--users 100000] [--bets 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from ledger import to_fixed  # noqa: E402
+from limits import LimitConfig, LimitExceeded, LimitsEngine  # noqa: E402
+
+BUDGET_US = 5.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--bets", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    clock_now = [0.0]
+    engine = LimitsEngine(LimitConfig(to_fixed(5000.0), 600), clock=lambda: clock_now[0])
+    users = [f"user-{i}" for i in range(args.users)]
+    stake, payout = to_fixed(1.0), to_fixed(2.0)
+    # Spread bets over two days so windows expire buckets along the way
+    seconds_per_bet = 2 * 24 * 3600 / args.bets
+
+    start = time.perf_counter()
+    for i in range(args.bets):
+        clock_now[0] = i * seconds_per_bet
+        user_id = users[i % args.users]
+        try:
+            window = engine.check(user_id, stake)
+        except LimitExceeded:
+            continue
+        engine.record(user_id, stake, payout if i % 3 == 0 else 0, window)
+    elapsed = time.perf_counter() - start
+
+    per_bet_us = elapsed / args.bets * 1e6
+    verdict = "within" if per_bet_us < BUDGET_US else "OVER"
+    print(f"check + record: {args.bets:,} bets over {args.users:,} users in {elapsed:.2f}s")
+    print(f"per bet:        {per_bet_us:.2f}us ({verdict} the {BUDGET_US:.0f}us budget)")
+    print(f"rejections:     {engine.rejections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Serving profile benchmark matrix for the CryptoSpins API
+
+Starts the API under each serving configuration, waits for /readyz, then
+drives a /bet and /balance mix over keep-alive connections and reports
+throughput and latency percentiles. The matrix starts from the image's
+previous `uvicorn main:app --workers N` command and varies the access log
+separately, so the profile is compared against what it actually replaced.
+
+Usage:
+    python benchmarks/serving_bench.py [--duration 10] [--connections 64] [--workers 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+PORT = 8765
+
+
+def configurations(workers: int):
+    # The image's previous CMD; with uvicorn[standard] installed it already picks
+    # uvloop and httptools, but logs every request
+    previous = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(PORT),
+                "--workers", str(workers)]
+    matrix = [
+        ("previous CMD (access log on)", previous, {}),
+        ("previous CMD, --no-access-log", previous + ["--no-access-log"], {}),
+        ("serving.py uvicorn, ACCESS_LOG=true", [sys.executable, "serving.py"],
+         {"SERVER_MODE": "uvicorn", "ACCESS_LOG": "true"}),
+        ("serving.py uvicorn", [sys.executable, "serving.py"], {"SERVER_MODE": "uvicorn"}),
+        # Reference only: what uvicorn falls back to without the [standard] extras
+        ("asyncio/h11 fallback", previous + ["--no-access-log", "--loop", "asyncio", "--http", "h11"], {}),
+    ]
+    if shutil.which("gunicorn"):
+        matrix.append(("gunicorn + uvicorn workers", [sys.executable, "serving.py"], {"SERVER_MODE": "gunicorn"}))
+    return [
+        (name, cmd, dict(env, HOST="127.0.0.1", PORT=str(PORT), WEB_CONCURRENCY=str(workers)))
+        for name, cmd, env in matrix
+    ]
+
+
+def wait_ready(timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/readyz", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def build_request(rng: random.Random) -> bytes:
+    user_id = f"user-{rng.randrange(1000)}"
+    if rng.random() < 0.5:
+        body = json.dumps({"user_id": user_id, "amount": 1.0}).encode()
+        head = (f"POST /bet HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode()
+        return head + body
+    return f"GET /balance/{user_id} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+
+
+async def connection(deadline: float, latencies: list, seed: int):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(build_request(rng))
+            await writer.drain()
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def drive(duration: float, connections: int) -> list:
+    latencies: list = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(connection(deadline, latencies, i) for i in range(connections)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'configuration':<40}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, cmd, env in configurations(args.workers):
+        server = subprocess.Popen(cmd, cwd=APP_DIR, env=dict(os.environ, **env),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready()
+            latencies = asyncio.run(drive(args.duration, args.connections))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f"{name:<40}{len(latencies) / args.duration:>12,.0f}"
+              f"{statistics.median(latencies) * 1000:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Bulk balance export/import benchmark for the CryptoSpins API
+
+Builds a ledger of synthetic users, streams it out in each snapshot format
+and imports it into an empty ledger, reporting throughput, payload size and
+the largest single chunk held in memory.
+
+Usage:
+    python benchmarks/snapshot_bench.py [--users 10000000] [--chunk-size 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from ledger import Ledger, to_fixed  # noqa: E402
+from snapshot import BalanceDecoder, encode_balances, import_balances  # noqa: E402
+
+IMPORT_READ_SIZE = 64 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    source = Ledger()
+    start = time.perf_counter()
+    for i in range(args.users):
+        source.open_account(f"user-{i}", to_fixed(1000.0 + i % 500))
+    print(f"built ledger with {args.users:,} users in {time.perf_counter() - start:.1f}s")
+
+    for fmt in ("ndjson", "binary"):
+        chunks = []
+        largest = 0
+        start = time.perf_counter()
+        for chunk in encode_balances(source, fmt, args.chunk_size):
+            largest = max(largest, len(chunk))
+            chunks.append(chunk)
+        export_seconds = time.perf_counter() - start
+        payload = b"".join(chunks)
+        del chunks
+
+        target = Ledger()
+        decoder = BalanceDecoder(fmt)
+        start = time.perf_counter()
+        imported = 0
+        # Feed the payload the way a request body stream arrives
+        view = memoryview(payload)
+        for offset in range(0, len(payload), IMPORT_READ_SIZE):
+            imported += import_balances(target, decoder.feed(bytes(view[offset:offset + IMPORT_READ_SIZE])))
+        imported += import_balances(target, decoder.close())
+        import_seconds = time.perf_counter() - start
+
+        print(f"{fmt:<7} export {export_seconds:6.2f}s ({args.users / export_seconds:>11,.0f} users/s)  "
+              f"import {import_seconds:6.2f}s ({imported / import_seconds:>11,.0f} users/s)  "
+              f"payload {len(payload) / 1e6:8.1f}MB  largest chunk {largest / 1e3:.0f}KB")
+        del payload, target
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Startup / cold-start benchmark for the CryptoSpins API
+
+Measures, in a fresh interpreter per run, how long it takes to import the
+app, run startup (warmup included), and serve the first /bet and /balance
+requests. Compares STARTUP_OPTIMIZED=true against the plain startup path.
+
+Usage:
+    python benchmarks/startup_bench.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    client.post("/bet", json={"user_id": "bench", "amount": 1.0})
+    t3 = time.perf_counter()
+    client.get("/balance/bench")
+    t4 = time.perf_counter()
+    client.post("/bet", json={"user_id": "bench", "amount": 1.0})
+    t5 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "startup_ms": (t2 - t1) * 1000,
+    "first_bet_ms": (t3 - t2) * 1000,
+    "first_balance_ms": (t4 - t3) * 1000,
+    "steady_bet_ms": (t5 - t4) * 1000,
+}))
+"""
+
+
+def run_once(optimized: bool) -> dict:
+    env = dict(os.environ, STARTUP_OPTIMIZED="true" if optimized else "false")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=APP_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    columns = ["import_ms", "startup_ms", "first_bet_ms", "first_balance_ms", "steady_bet_ms"]
+    print(f"{'mode':<12}" + "".join(f"{c:>18}" for c in columns))
+    for optimized in (False, True):
+        samples = [run_once(optimized) for _ in range(args.runs)]
+        medians = {c: statistics.median(s[c] for s in samples) for c in columns}
+        mode = "optimized" if optimized else "default"
+        print(f"{mode:<12}" + "".join(f"{medians[c]:>18.2f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local stand-in for Prometheus adapter + HPA scaling decisions
+
+Scrapes /metrics from one or more pods, averages a per-pod gauge the way a
+`Pods` metric with an `AverageValue` target is averaged, and applies the HPA
+replica formula. Useful for checking what the autoscaler would do with the
+exported saturation gauges without a cluster. Lives outside app/ so it is not
+shipped in the API image.
+
+Usage:
+    python scripts/hpa_adapter.py http://localhost:8000 --metric cryptospins_bets_per_second --target 50
+"""
+import argparse
+import math
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def parse_metrics(text: str) -> Dict[Sample, float]:
+    """Parse Prometheus text exposition into {(name, labels): value}"""
+    samples: Dict[Sample, float] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        series, _, value = line.rpartition(" ")
+        labels: Tuple[Tuple[str, str], ...] = ()
+        name = series
+        if "{" in series:
+            name, _, raw = series.partition("{")
+            pairs = [pair.split("=", 1) for pair in raw.rstrip("}").split(",") if pair]
+            labels = tuple(sorted((key, val.strip('"')) for key, val in pairs))
+        samples[(name, labels)] = float(value)
+    return samples
+
+
+def pod_metric(samples: Dict[Sample, float], metric: str,
+               labels: Optional[Dict[str, str]] = None) -> float:
+    """Look up a single series for one pod"""
+    key = (metric, tuple(sorted((labels or {}).items())))
+    if key not in samples:
+        raise KeyError(f"metric {metric} {labels or ''} not exported")
+    return samples[key]
+
+
+def desired_replicas(pod_values: List[float], target: float, min_replicas: int = 1,
+                     max_replicas: int = 10, tolerance: float = 0.1) -> int:
+    """HPA algorithm for an AverageValue target over the given ready pods"""
+    current = len(pod_values)
+    if current == 0:
+        return min_replicas
+    ratio = (sum(pod_values) / current) / target
+    if abs(ratio - 1.0) <= tolerance:
+        desired = current
+    else:
+        desired = math.ceil(ratio * current)
+    return max(min_replicas, min(max_replicas, desired))
+
+
+def scrape(url: str, timeout: float = 5.0) -> Dict[Sample, float]:
+    with urllib.request.urlopen(f"{url.rstrip('/')}/metrics", timeout=timeout) as response:
+        return parse_metrics(response.read().decode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate an HPA decision from pod /metrics")
+    parser.add_argument("pods", nargs="+", help="Base URLs of the pods to scrape")
+    parser.add_argument("--metric", default="cryptospins_bets_per_second")
+    parser.add_argument("--target", type=float, default=50.0)
+    parser.add_argument("--min-replicas", type=int, default=2)
+    parser.add_argument("--max-replicas", type=int, default=10)
+    args = parser.parse_args()
+
+    values = [pod_metric(scrape(url), args.metric) for url in args.pods]
+    for url, value in zip(args.pods, values):
+        print(f"{url}: {args.metric}={value:.3f}")
+    replicas = desired_replicas(values, args.target, args.min_replicas, args.max_replicas)
+    print(f"desired replicas: {replicas} (current {len(values)}, target {args.target} per pod)")
+
+
+if __name__ == "__main__":
+    main()
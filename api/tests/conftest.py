@@ -6,6 +6,8 @@ import os
 
 # Add the app directory to the path so we can import main
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+# Operational scripts live outside the app image but are tested alongside it
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
 from main import app
 
@@ -14,6 +16,20 @@ def client():
     """Create a test client for the FastAPI app"""
     return TestClient(app)
 
+class FakeClock:
+    """Manually advanced stand-in for time.time / time.monotonic"""
+
+    def __init__(self, now=1_000 * 3600.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fake_clock():
+    """Clock for time-windowed components, starting on an hour boundary"""
+    return FakeClock()
+
 @pytest.fixture
 def sample_user_id():
     """Sample user ID for testing"""
@@ -33,10 +49,19 @@ def sample_bet_data():
 def reset_app_state():
     """Reset application state before each test"""
     # Clear in-memory storage before each test
-    from main import user_balances, bet_history
-    user_balances.clear()
+    from main import (
+        ledger, bet_history, reset_bet_totals, limits, warmup_state, saturation_monitor, request_rates
+    )
+    ledger.reset()
     bet_history.clear()
+    reset_bet_totals()
+    limits.reset()
+    warmup_state.reset()
+    saturation_monitor.reset()
+    request_rates.reset()
     yield
     # Clean up after test
-    user_balances.clear()
-    bet_history.clear()
\ No newline at end of file
+    ledger.reset()
+    bet_history.clear()
+    reset_bet_totals()
+    limits.reset()
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Test suite for CryptoSpins offline analytics export and queries
+"""
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import analytics_export  # noqa: E402
+import analytics_query  # noqa: E402
+from analytics_export import BetExporter  # noqa: E402
+from main import bet_history  # noqa: E402
+
+NOW = datetime(2026, 1, 5, 12, 30)
+
+
+def make_history():
+    """Bets spread over the last three hours, oldest first"""
+    history = {}
+    rows = [
+        ("u1", "slots", 100.0, 200.0, "win", NOW - timedelta(hours=2, minutes=50)),
+        ("u2", "slots", 50.0, 0.0, "loss", NOW - timedelta(hours=2, minutes=10)),
+        ("u1", "roulette", 20.0, 0.0, "loss", NOW - timedelta(hours=1, minutes=40)),
+        ("u3", "roulette", 10.0, 30.0, "win", NOW - timedelta(minutes=5)),
+    ]
+    for i, (user_id, game_type, amount, win_amount, result, ts) in enumerate(rows):
+        history[f"bet-{i}"] = {
+            "user_id": user_id, "amount": amount, "win_amount": win_amount,
+            "result": result, "game_type": game_type, "timestamp": ts.isoformat(),
+        }
+    return history
+
+
+class TestBetExporter:
+    """Test flushing settled bets to hour-partitioned files"""
+
+    def test_collect_respects_retention(self):
+        """Test that only bets older than the retention window are flushed"""
+        history = make_history()
+        exporter = BetExporter(history, "unused", retain_seconds=3600)
+        rows = exporter.collect(now=NOW)
+        assert [bet_id for bet_id, _ in rows] == ["bet-0", "bet-1", "bet-2"]
+        assert list(history) == ["bet-3"]
+
+    def test_collect_caps_rows(self):
+        """Test that a single flush is bounded"""
+        history = make_history()
+        exporter = BetExporter(history, "unused", retain_seconds=0, max_rows=2)
+        assert len(exporter.collect(now=NOW)) == 2
+        assert len(history) == 2
+
+    def test_write_partitions_by_hour(self, tmp_path):
+        """Test that files land in date/hour partitions"""
+        history = make_history()
+        exporter = BetExporter(history, str(tmp_path), retain_seconds=0, fmt="npz")
+        paths = exporter.write(exporter.collect(now=NOW))
+        partitions = sorted(os.path.relpath(os.path.dirname(p), tmp_path) for p in paths)
+        assert partitions == [
+            os.path.join("date=2026-01-05", "hour=09"),
+            os.path.join("date=2026-01-05", "hour=10"),
+            os.path.join("date=2026-01-05", "hour=12"),
+        ]
+        assert not any(name.endswith(".tmp") for _, _, files in os.walk(tmp_path) for name in files)
+
+    def test_concurrent_writers_never_collide(self, tmp_path):
+        """Test that exporters sharing a directory can't overwrite each other's files"""
+        writers = [BetExporter(make_history(), str(tmp_path), retain_seconds=0, fmt="npz")
+                   for _ in range(2)]
+        with patch("analytics_export.time.time", return_value=1_700_000_000.0):
+            paths = [path for exporter in writers for path in exporter.write(exporter.collect(now=NOW))]
+        assert len(set(paths)) == len(paths) == 6
+        assert len(analytics_query.load(str(tmp_path))["amount"]) == 8
+
+    def test_failed_write_retries_bets_in_order(self, tmp_path):
+        """Test that bets from a failed flush are retried first, oldest first"""
+        history = make_history()
+        exporter = BetExporter(history, str(tmp_path), retain_seconds=0, fmt="npz")
+        with patch.object(exporter, "write", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                asyncio.run(exporter.run_once())
+        assert exporter.rows_exported == 0
+        history["bet-4"] = dict(make_history()["bet-3"], timestamp=(NOW - timedelta(minutes=1)).isoformat())
+        rows = exporter.collect(now=NOW)
+        assert [bet_id for bet_id, _ in rows] == ["bet-0", "bet-1", "bet-2", "bet-3", "bet-4"]
+
+    def test_partial_write_publishes_nothing(self, tmp_path):
+        """Test that a flush failing on a later partition leaves no files to double-count"""
+        exporter = BetExporter(make_history(), str(tmp_path), retain_seconds=0, fmt="npz")
+        real_write = analytics_export._write_npz
+        calls = []
+
+        def flaky_write(path, columns):
+            calls.append(path)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            real_write(path, columns)
+
+        with patch.object(analytics_export, "_write_npz", side_effect=flaky_write):
+            with pytest.raises(OSError):
+                asyncio.run(exporter.run_once())
+        assert [name for _, _, files in os.walk(tmp_path) for name in files] == []
+
+        asyncio.run(exporter.run_once())
+        columns = analytics_query.load(str(tmp_path))
+        assert len(columns["amount"]) == 4
+        assert exporter.rows_exported == 4
+
+
+class TestAnalyticsQuery:
+    """Test vectorized aggregates over exported files"""
+
+    @pytest.fixture
+    def export_dir(self, tmp_path):
+        exporter = BetExporter(make_history(), str(tmp_path), retain_seconds=0, fmt="npz")
+        asyncio.run(exporter.run_once())
+        return str(tmp_path)
+
+    def test_overall_stats(self, export_dir):
+        """Test totals across all exported bets"""
+        result = analytics_query.stats(analytics_query.load(export_dir))
+        assert result["total_bets"] == 4
+        assert result["total_wins"] == 2
+        assert result["total_wagered"] == 180.0
+        assert result["total_winnings"] == 230.0
+        assert result["active_users"] == 3
+
+    def test_aggregate_by_game_type(self, export_dir):
+        """Test grouping by game type"""
+        result = analytics_query.aggregate(analytics_query.load(export_dir), "game_type")
+        assert result["slots"]["total_bets"] == 2
+        assert result["slots"]["total_wagered"] == 150.0
+        assert result["roulette"]["win_rate"] == 0.5
+
+    def test_aggregate_by_user_and_hour(self, export_dir):
+        """Test grouping by user and by hour"""
+        columns = analytics_query.load(export_dir)
+        by_user = analytics_query.aggregate(columns, "user_id")
+        assert by_user["u1"]["total_bets"] == 2
+        assert by_user["u1"]["total_winnings"] == 200.0
+        by_hour = analytics_query.aggregate(columns, "hour")
+        assert sorted(by_hour) == ["2026-01-05T09", "2026-01-05T10", "2026-01-05T12"]
+
+    def test_date_partition_pruning(self, export_dir):
+        """Test that partitions outside the date range are skipped"""
+        assert analytics_query.partition_files(export_dir, start=date(2026, 1, 6)) == []
+        columns = analytics_query.load(export_dir, end=date(2026, 1, 4))
+        assert analytics_query.stats(columns)["total_bets"] == 0
+
+    def test_unknown_grouping(self, export_dir):
+        """Test that unsupported groupings are rejected"""
+        with pytest.raises(ValueError):
+            analytics_query.aggregate(analytics_query.load(export_dir), "country")
+
+    def test_parquet_round_trip(self, tmp_path):
+        """Test the Parquet path when pyarrow is installed"""
+        pytest.importorskip("pyarrow")
+        exporter = BetExporter(make_history(), str(tmp_path), retain_seconds=0, fmt="parquet")
+        asyncio.run(exporter.run_once())
+        result = analytics_query.stats(analytics_query.load(str(tmp_path)))
+        assert result["total_bets"] == 4
+
+
+class TestStatsAfterExport:
+    """Test that the live API's stats survive flushing bet_history"""
+
+    def test_stats_unchanged_by_flush(self, client, sample_bet_data, tmp_path):
+        """Test that /stats uses running totals, not bet_history"""
+        for _ in range(3):
+            client.post("/bet", json=sample_bet_data)
+        before = client.get("/stats").json()
+
+        exporter = BetExporter(bet_history, str(tmp_path), retain_seconds=-60, fmt="npz")
+        asyncio.run(exporter.run_once())
+        assert len(bet_history) == 0
+
+        assert client.get("/stats").json() == before
+        exported = analytics_query.stats(analytics_query.load(str(tmp_path)))
+        assert exported["total_bets"] == before["total_bets"]
+        assert exported["total_wagered"] == before["total_wagered"]
@@ -0,0 +1,204 @@
+"""
+Test suite for the CryptoSpins double-entry ledger
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from ledger import HOUSE_ACCOUNT, MAX_AMOUNT, Ledger, LedgerCompactor, from_fixed, to_fixed
+from main import ledger as app_ledger
+
+
+class TestFixedPoint:
+    """Test fixed-point amount conversion"""
+
+    def test_round_trip(self):
+        """Test that common bet amounts survive conversion exactly"""
+        for amount in (0.01, 0.1, 1.5, 100.0, 1000.0, 123.456789):
+            assert from_fixed(to_fixed(amount)) == amount
+
+    def test_no_drift_over_many_bets(self):
+        """Test that repeated small stakes do not accumulate float error"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        for _ in range(10_000):
+            ledger.stake("user", to_fixed(0.1))
+        assert ledger.balance("user") == to_fixed(0.0)
+        assert from_fixed(ledger.balance("user")) == 0.0
+
+    def test_out_of_range_amounts_rejected(self):
+        """Test that amounts that can't fit a journal entry raise ValueError"""
+        for amount in (float("inf"), float("-inf"), float("nan"), 1e20, -1e20):
+            with pytest.raises(ValueError):
+                to_fixed(amount)
+        assert to_fixed(9e12) == 9_000_000_000_000_000_000
+
+
+class TestJournal:
+    """Test double-entry postings and materialized balances"""
+
+    def test_every_transfer_is_balanced(self):
+        """Test that each transfer writes a debit and a matching credit"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0), ref="grant")
+        ledger.stake("user", to_fixed(100.0), ref="bet-1")
+        ledger.payout("user", to_fixed(200.0), ref="bet-1")
+
+        entries = list(ledger.entries())
+        assert len(entries) == 6
+        assert sum(delta for _, delta, _ in entries) == 0
+        assert [ref for _, _, ref in entries] == ["grant", "grant", "bet-1", "bet-1", "bet-1", "bet-1"]
+        assert ledger.balance("user") == to_fixed(1100.0)
+        assert ledger.house_balance() == -to_fixed(1100.0)
+
+    def test_reconcile_clean_ledger(self):
+        """Test that an untouched journal reconciles"""
+        ledger = Ledger()
+        for i in range(50):
+            ledger.open_account(f"user-{i}", to_fixed(1000.0))
+            ledger.stake(f"user-{i}", to_fixed(10.0))
+        result = ledger.reconcile()
+        assert result.ok
+        assert result.entries_checked == 200
+
+    def test_reconcile_detects_drift(self):
+        """Test that a materialized balance out of step with the journal is reported"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        ledger._balances[ledger.account_id("user")] += 1
+        result = ledger.reconcile()
+        assert not result.ok
+        assert result.mismatched_accounts == [ledger.account_id("user")]
+
+    def test_rejected_transfer_leaves_no_trace(self):
+        """Test that an out-of-range posting fails before mutating the journal"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        for amount in (MAX_AMOUNT + 1, -1, MAX_AMOUNT):
+            with pytest.raises(ValueError):
+                ledger.payout("user", amount)
+        assert ledger.journal_size == 2
+        assert len(list(ledger.entries())) == 2
+        assert ledger.balance("user") == to_fixed(1000.0)
+        assert ledger.reconcile().ok
+
+
+class TestCompaction:
+    """Test folding old postings into checkpoints"""
+
+    def test_compaction_preserves_balances(self):
+        """Test that compaction shrinks the journal without changing balances"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        for _ in range(10):
+            ledger.stake("user", to_fixed(5.0))
+        folded = ledger.compact(retain=4)
+        assert folded == 18
+        assert ledger.journal_size == 4
+        assert ledger.checkpoint_seq == 18
+        assert ledger.balance("user") == to_fixed(950.0)
+        assert ledger.reconcile().ok
+
+    def test_compaction_never_splits_a_transfer(self):
+        """Test that an odd retain count keeps debit and credit together"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        ledger.stake("user", to_fixed(5.0))
+        ledger.compact(retain=1)
+        assert ledger.journal_size == 2
+        assert len(list(ledger.entries())) == 2
+        assert ledger.reconcile().ok
+
+    def test_compactor_run_once(self):
+        """Test the background compaction and off-loop reconciliation step"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        ledger.payout("user", to_fixed(1.0))
+        compactor = LedgerCompactor(ledger, retain=0)
+        result = asyncio.run(compactor.run_once())
+        assert result.ok
+        assert ledger.journal_size == 0
+        assert compactor.last_result is result
+
+    def test_detached_postings_fold_later(self):
+        """Test that detaching is cheap and folding afterwards restores the checkpoint"""
+        ledger = Ledger()
+        ledger.open_account("user", to_fixed(1000.0))
+        for _ in range(5):
+            ledger.stake("user", to_fixed(1.0), "bet")
+        accounts, deltas = ledger.detach(retain=2)
+        assert len(deltas) == 10
+        assert ledger.journal_size == 2
+        assert [ref for _, _, ref in ledger.entries()] == ["bet", "bet"]
+        ledger.fold(accounts, deltas)
+        assert ledger.reconcile().ok
+
+
+class TestLedgerIntegration:
+    """Test the API's use of the ledger"""
+
+    def test_bet_records_journal_entries(self, client, sample_bet_data):
+        """Test that a winning bet records grant, stake and payout transfers"""
+        with patch('random.random', return_value=0.1):
+            bet = client.post("/bet", json=sample_bet_data).json()
+        refs = [ref for _, _, ref in app_ledger.entries()]
+        assert refs.count(bet["bet_id"]) == 4
+        assert app_ledger.reconcile().ok
+
+    def test_balance_reads_materialized_value(self, client, sample_user_id):
+        """Test that /balance reflects the materialized fixed-point balance"""
+        with patch('random.random', return_value=0.8):
+            for _ in range(10):
+                client.post("/bet", json={"user_id": sample_user_id, "amount": 0.1})
+        response = client.get(f"/balance/{sample_user_id}")
+        assert response.json()["balance"] == 999.0
+
+    def test_huge_multiplier_rejected_before_staking(self, client, sample_bet_data, sample_user_id):
+        """Test that an unpayable win is refused up front instead of half-applied"""
+        with patch('random.random', return_value=0.1):
+            response = client.post("/bet", json={**sample_bet_data, "multiplier": 1e20})
+        assert response.status_code == 400
+        assert client.get(f"/balance/{sample_user_id}").json()["balance"] == 1000.0
+        assert app_ledger.reconcile().ok
+        assert client.get("/stats").json()["total_bets"] == 0
+
+    def test_sub_unit_stake_rejected(self, client, sample_user_id):
+        """Test that an amount rounding to a zero stake can't be played for free"""
+        with patch('random.random', return_value=0.1):
+            response = client.post("/bet", json={"user_id": sample_user_id, "amount": 4e-7,
+                                                 "multiplier": 1e6})
+        assert response.status_code == 400
+        assert client.get(f"/balance/{sample_user_id}").json()["balance"] == 1000.0
+        assert client.get("/stats").json()["total_bets"] == 0
+
+    def test_recorded_amount_matches_journal(self, client, sample_user_id):
+        """Test that history, totals and the response report the stake actually debited"""
+        with patch('random.random', return_value=0.8):
+            bet = client.post("/bet", json={"user_id": sample_user_id, "amount": 1.0000004}).json()
+        assert bet["amount"] == 1.0
+        assert client.get(f"/bet/{bet['bet_id']}").json()["amount"] == 1.0
+        assert client.get("/stats").json()["total_wagered"] == 1.0
+        stakes = [delta for account, delta, ref in app_ledger.entries()
+                  if ref == bet["bet_id"] and account != HOUSE_ACCOUNT]
+        assert stakes == [-to_fixed(1.0)]
+
+    def test_non_finite_bets_rejected(self, client, sample_user_id):
+        """Test that infinite or absurd amounts and multipliers are 400s, not 500s"""
+        bodies = [
+            '{"user_id": "%s", "amount": 1e400}' % sample_user_id,
+            '{"user_id": "%s", "amount": 1e20}' % sample_user_id,
+            '{"user_id": "%s", "amount": 1.0, "multiplier": 1e400}' % sample_user_id,
+            '{"user_id": "%s", "amount": 1.0, "multiplier": -2.0}' % sample_user_id,
+            '{"user_id": "%s", "amount": 1.0, "multiplier": null}' % sample_user_id,
+        ]
+        for body in bodies:
+            response = client.post("/bet", content=body, headers={"Content-Type": "application/json"})
+            assert response.status_code == 400, body
+        assert app_ledger.reconcile().ok
+
+    def test_house_account_is_not_a_user(self, client, sample_user_id):
+        """Test that the house account doesn't count as an active user"""
+        client.get(f"/balance/{sample_user_id}")
+        assert client.get("/stats").json()["active_users"] == 1
+        assert app_ledger.account_id(sample_user_id) != HOUSE_ACCOUNT
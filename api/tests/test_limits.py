@@ -0,0 +1,152 @@
+"""
+Test suite for CryptoSpins responsible-gambling limits
+"""
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+
+import main
+from hpa_adapter import parse_metrics, pod_metric
+from ledger import to_fixed
+from limits import (
+    DAILY_LOSS, HOURLY_WAGERS, WINDOW_HOURS, LimitConfig, LimitExceeded, LimitsEngine, UserWindow,
+)
+
+HOUR = 3600
+
+
+class TestLimitsEngine:
+    """Test rolling loss and hourly wager windows"""
+
+    def test_daily_loss_limit(self, fake_clock):
+        """Test that stakes beyond the remaining loss allowance are rejected"""
+        engine = LimitsEngine(LimitConfig(daily_net_loss=to_fixed(100.0)), fake_clock)
+        engine.check("u", to_fixed(60.0))
+        engine.record("u", to_fixed(60.0), 0)
+        with pytest.raises(LimitExceeded) as exc:
+            engine.check("u", to_fixed(50.0))
+        assert exc.value.limit == DAILY_LOSS
+        engine.check("u", to_fixed(40.0))
+        assert engine.rejections[DAILY_LOSS] == 1
+
+    def test_winnings_offset_losses(self, fake_clock):
+        """Test that the window tracks net loss, not gross stakes"""
+        engine = LimitsEngine(LimitConfig(daily_net_loss=to_fixed(100.0)), fake_clock)
+        engine.record("u", to_fixed(90.0), 0)
+        engine.record("u", to_fixed(10.0), to_fixed(50.0))
+        assert engine.usage("u").net_loss == to_fixed(50.0)
+        engine.check("u", to_fixed(50.0))
+
+    def test_losses_roll_out_after_24_hours(self, fake_clock):
+        """Test that old losses expire from the rolling window hour by hour"""
+        engine = LimitsEngine(LimitConfig(daily_net_loss=to_fixed(100.0)), fake_clock)
+        engine.record("u", to_fixed(70.0), 0)
+        fake_clock.now += 5 * HOUR
+        engine.record("u", to_fixed(30.0), 0)
+        with pytest.raises(LimitExceeded):
+            engine.check("u", to_fixed(1.0))
+
+        fake_clock.now += 19 * HOUR  # first loss is now 24h old
+        assert engine.usage("u").net_loss == to_fixed(30.0)
+        engine.check("u", to_fixed(70.0))
+
+        fake_clock.now += 48 * HOUR
+        assert engine.usage("u").net_loss == 0
+
+    @pytest.mark.parametrize("start", [0, 5, 20, 23])
+    def test_expiry_across_bucket_wraparound(self, start):
+        """Test that expiring a run of hours matches clearing them one by one"""
+        for elapsed in range(1, WINDOW_HOURS + 2):
+            window = UserWindow(start)
+            for slot in range(WINDOW_HOURS):
+                window.buckets[slot] = slot + 1
+            window.net_loss = sum(window.buckets)
+            expected = list(window.buckets)
+            for h in range(start + 1, start + elapsed + 1):
+                expected[h % WINDOW_HOURS] = 0
+            window.advance(start + elapsed)
+            assert list(window.buckets) == expected
+            assert window.net_loss == sum(expected)
+
+    def test_hourly_wager_limit(self, fake_clock):
+        """Test that the wager count resets at the next hour"""
+        engine = LimitsEngine(LimitConfig(hourly_wagers=3), fake_clock)
+        for _ in range(3):
+            engine.check("u", 1)
+            engine.record("u", 1, 0)
+        with pytest.raises(LimitExceeded) as exc:
+            engine.check("u", 1)
+        assert exc.value.limit == HOURLY_WAGERS
+        fake_clock.now += HOUR
+        engine.check("u", 1)
+
+    def test_disabled_limits(self, fake_clock):
+        """Test that zero limits are not enforced"""
+        engine = LimitsEngine(LimitConfig(), fake_clock)
+        for _ in range(100):
+            engine.check("u", to_fixed(1000.0))
+            engine.record("u", to_fixed(1000.0), 0)
+
+    def test_idle_windows_evicted(self, fake_clock):
+        """Test that users idle for a full window stop holding memory"""
+        engine = LimitsEngine(LimitConfig(daily_net_loss=to_fixed(100.0)), fake_clock)
+        for i in range(50):
+            engine.record(f"idle-{i}", to_fixed(10.0), 0)
+        engine.record("active", to_fixed(90.0), 0)
+        fake_clock.now += 23 * HOUR
+        engine.check("active", to_fixed(1.0))
+        assert engine.tracked_users == 51
+
+        fake_clock.now += HOUR
+        for _ in range(25):
+            engine.check("active", to_fixed(1.0))
+        assert engine.tracked_users == 1
+        # Losses recorded 24h ago have expired, so eviction lost nothing
+        assert engine.usage("active").net_loss == 0
+
+    def test_config_from_env(self, monkeypatch):
+        """Test that limits are configurable through the environment"""
+        monkeypatch.setenv("LIMIT_DAILY_NET_LOSS", "250.5")
+        monkeypatch.setenv("LIMIT_HOURLY_WAGERS", "10")
+        config = LimitConfig.from_env(to_fixed)
+        assert config.daily_net_loss == to_fixed(250.5)
+        assert config.hourly_wagers == 10
+
+
+class TestBetLimits:
+    """Test limit enforcement in the betting endpoint"""
+
+    @pytest.fixture
+    def strict_limits(self, monkeypatch):
+        monkeypatch.setattr(main.limits, "config",
+                            LimitConfig(daily_net_loss=to_fixed(150.0), hourly_wagers=5))
+
+    def test_loss_limit_rejects_before_deducting(self, client, strict_limits, sample_user_id):
+        """Test that a rejected bet leaves the balance untouched"""
+        with patch('random.random', return_value=0.8):  # Force loss
+            bet = {"user_id": sample_user_id, "amount": 100.0}
+            assert client.post("/bet", json=bet).status_code == status.HTTP_200_OK
+            response = client.post("/bet", json=bet)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "Daily loss limit reached" in response.json()["detail"]
+        assert client.get(f"/balance/{sample_user_id}").json()["balance"] == 900.0
+        assert client.get("/stats").json()["total_bets"] == 1
+
+    def test_wager_limit(self, client, strict_limits, sample_user_id):
+        """Test that the hourly wager count is enforced"""
+        with patch('random.random', return_value=0.1):  # Force wins so loss never binds
+            for _ in range(5):
+                client.post("/bet", json={"user_id": sample_user_id, "amount": 1.0})
+            response = client.post("/bet", json={"user_id": sample_user_id, "amount": 1.0})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "Hourly wager limit reached" in response.json()["detail"]
+
+    def test_rejections_exported(self, client, strict_limits, sample_user_id):
+        """Test that limit-triggered rejections are counted on /metrics"""
+        with patch('random.random', return_value=0.8):
+            for _ in range(3):
+                client.post("/bet", json={"user_id": sample_user_id, "amount": 100.0})
+        samples = parse_metrics(client.get("/metrics").text)
+        assert pod_metric(samples, "cryptospins_limit_rejections_total", {"limit": DAILY_LOSS}) == 2
+        assert pod_metric(samples, "cryptospins_limit_rejections_total", {"limit": HOURLY_WAGERS}) == 0
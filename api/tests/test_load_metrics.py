@@ -0,0 +1,104 @@
+"""
+Test suite for CryptoSpins autoscaling metrics and the HPA adapter stand-in
+"""
+import pytest
+
+from hpa_adapter import desired_replicas, parse_metrics, pod_metric
+from load_metrics import RequestRateWindow, excess_concurrency
+from main import saturation_monitor
+
+
+class TestRequestRateWindow:
+    """Test sliding-window request rates"""
+
+    def test_rate_over_window(self, fake_clock):
+        """Test that counts are averaged over the window"""
+        window = RequestRateWindow(window_seconds=10, clock=fake_clock)
+        start = fake_clock.now
+        for second in range(5):
+            fake_clock.now = start + second
+            for _ in range(4):
+                window.record("POST", "/bet")
+        assert window.rate("POST", "/bet") == pytest.approx(2.0)
+        assert window.rate("GET", "/balance/{user_id}") == 0.0
+
+    def test_old_buckets_expire(self, fake_clock):
+        """Test that requests older than the window no longer count"""
+        window = RequestRateWindow(window_seconds=10, clock=fake_clock)
+        for _ in range(20):
+            window.record("POST", "/bet")
+        fake_clock.now += 10
+        assert window.rate("POST", "/bet") == 0.0
+        window.record("POST", "/bet")
+        assert window.rate("POST", "/bet") == pytest.approx(0.1)
+
+    def test_excess_concurrency(self):
+        """Test that only requests beyond target concurrency count as excess"""
+        assert excess_concurrency(10, 50) == 0
+        assert excess_concurrency(65, 50) == 15
+
+
+class TestAutoscalingMetricsEndpoint:
+    """Test the saturation gauges exported on /metrics"""
+
+    def test_route_rates_exported(self, client, sample_bet_data, sample_user_id):
+        """Test that per-route rates use route templates, not raw paths"""
+        for _ in range(3):
+            client.post("/bet", json=sample_bet_data)
+        client.get(f"/balance/{sample_user_id}")
+        client.get("/does-not-exist")
+
+        samples = parse_metrics(client.get("/metrics").text)
+        assert pod_metric(samples, "cryptospins_bets_per_second") > 0
+        assert pod_metric(samples, "cryptospins_requests_per_second",
+                          {"method": "GET", "route": "/balance/{user_id}"}) > 0
+        assert not any(labels and dict(labels).get("route") == "/does-not-exist"
+                       for _, labels in samples)
+
+    def test_saturation_gauges_exported(self, client):
+        """Test that in-flight, excess concurrency and loop gauges are exported"""
+        saturation_monitor.loop_utilization = 0.25
+        samples = parse_metrics(client.get("/metrics").text)
+        # The scrape itself is in flight while metrics are rendered
+        assert pod_metric(samples, "cryptospins_in_flight_requests") == 1
+        assert pod_metric(samples, "cryptospins_excess_concurrency") == 0
+        assert pod_metric(samples, "cryptospins_event_loop_utilization") == 0.25
+        assert pod_metric(samples, "cryptospins_event_loop_lag_seconds") == 0
+
+
+class TestHpaAdapter:
+    """Test the Prometheus adapter / HPA stand-in against exported gauges"""
+
+    def test_parse_metrics_with_labels(self):
+        """Test parsing of labelled and unlabelled series"""
+        samples = parse_metrics(
+            'cryptospins_bets_per_second 12.5\n'
+            'cryptospins_requests_per_second{method="POST",route="/bet"} 12.5\n'
+        )
+        assert pod_metric(samples, "cryptospins_bets_per_second") == 12.5
+        assert pod_metric(samples, "cryptospins_requests_per_second",
+                          {"route": "/bet", "method": "POST"}) == 12.5
+        with pytest.raises(KeyError):
+            pod_metric(samples, "cryptospins_missing")
+
+    def test_desired_replicas_scale_up(self):
+        """Test scale-up when pods average above target"""
+        assert desired_replicas([120.0, 80.0], target=50.0) == 4
+
+    def test_desired_replicas_within_tolerance(self):
+        """Test that small deviations don't trigger scaling"""
+        assert desired_replicas([52.0, 50.0], target=50.0) == 2
+
+    def test_desired_replicas_clamped(self):
+        """Test that replica counts respect min and max bounds"""
+        assert desired_replicas([1.0, 1.0], target=50.0, min_replicas=2) == 2
+        assert desired_replicas([1000.0] * 3, target=50.0, max_replicas=10) == 10
+
+    def test_scaling_decision_from_live_metrics(self, client, sample_bet_data):
+        """Test an end-to-end decision from the API's own /metrics output"""
+        for _ in range(20):
+            client.post("/bet", json=dict(sample_bet_data, amount=1.0))
+        samples = parse_metrics(client.get("/metrics").text)
+        rate = pod_metric(samples, "cryptospins_bets_per_second")
+        assert rate == pytest.approx(2.0)  # 20 bets over a 10s window
+        assert desired_replicas([rate, rate], target=0.5, max_replicas=20) == 8
@@ -0,0 +1,106 @@
+"""
+Test suite for CryptoSpins liveness, readiness and saturation monitoring
+"""
+import asyncio
+import time
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from main import app, saturation_monitor
+from saturation import InFlightMiddleware, SaturationMonitor, SaturationThresholds
+
+
+class TestProbeEndpoints:
+    """Test liveness and readiness probe endpoints"""
+
+    def test_livez_always_alive(self, client):
+        """Test that liveness does not depend on warmup or load"""
+        saturation_monitor.in_flight = 10_000
+        saturation_monitor.evaluate()
+        response = client.get("/livez")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "alive"
+
+    def test_readyz_ready_when_unsaturated(self):
+        """Test that a warmed, idle pod is ready"""
+        with TestClient(app) as client:
+            response = client.get("/readyz")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["status"] == "ready"
+
+    def test_readyz_unready_when_saturated(self):
+        """Test that crossing a threshold takes the pod out of rotation"""
+        with TestClient(app) as client:
+            saturation_monitor.loop_lag_ms = saturation_monitor.thresholds.max_loop_lag_ms + 1
+            saturation_monitor.evaluate()
+            response = client.get("/readyz")
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            data = response.json()
+            assert data["status"] == "saturated"
+            assert any("event loop lag" in reason for reason in data["reasons"])
+
+    def test_health_still_available(self, client):
+        """Test that the legacy health endpoint is unchanged"""
+        response = client.get("/health")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "healthy"
+
+
+class TestSaturationMonitor:
+    """Test saturation verdicts and background sampling"""
+
+    def test_thresholds_from_env(self, monkeypatch):
+        """Test that thresholds are configurable through the environment"""
+        monkeypatch.setenv("READINESS_MAX_LOOP_LAG_MS", "50")
+        monkeypatch.setenv("READINESS_MAX_IN_FLIGHT", "8")
+        thresholds = SaturationThresholds.from_env()
+        assert thresholds.max_loop_lag_ms == 50.0
+        assert thresholds.max_in_flight == 8
+
+    def test_evaluate_reports_each_reason(self):
+        """Test that every breached threshold is reported"""
+        monitor = SaturationMonitor(SaturationThresholds(10, 2))
+        monitor.loop_lag_ms = 20
+        monitor.in_flight = 3
+        monitor.evaluate()
+        assert not monitor.ready
+        assert len(monitor.reasons) == 2
+
+        monitor.reset()
+        monitor.evaluate()
+        assert monitor.ready
+        assert monitor.reasons == []
+
+    def test_blocked_loop_marks_unready(self):
+        """Test that the background sampler notices a loop blocked by synchronous work"""
+        async def scenario():
+            monitor = SaturationMonitor(SaturationThresholds(max_loop_lag_ms=20),
+                                        interval_seconds=0.01)
+            monitor.start()
+            await asyncio.sleep(0.02)
+            time.sleep(0.1)
+            for _ in range(10):
+                await asyncio.sleep(0)
+                if not monitor.ready:
+                    break
+            verdict = (monitor.ready, monitor.reasons)
+            await monitor.stop()
+            return verdict
+
+        ready, reasons = asyncio.run(scenario())
+        assert not ready
+        assert any("event loop lag" in reason for reason in reasons)
+
+    def test_in_flight_middleware_counts_requests(self):
+        """Test that the in-flight gauge rises during a request and falls after"""
+        monitor = SaturationMonitor(SaturationThresholds())
+        observed = []
+
+        async def inner(scope, receive, send):
+            observed.append(monitor.in_flight)
+
+        middleware = InFlightMiddleware(inner, monitor)
+        asyncio.run(middleware({"type": "http"}, None, None))
+        assert observed == [1]
+        assert monitor.in_flight == 0
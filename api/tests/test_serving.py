@@ -0,0 +1,117 @@
+"""
+Test suite for the CryptoSpins production serving profile
+"""
+import importlib
+
+import pytest
+
+import serving
+
+
+@pytest.fixture(autouse=True)
+def clear_serving_env(monkeypatch):
+    """Isolate tests from serving-related environment variables"""
+    for name in ("WEB_CONCURRENCY", "KEEP_ALIVE_SECONDS", "BACKLOG", "MAX_REQUESTS",
+                 "MAX_REQUESTS_JITTER", "HOST", "PORT"):
+        monkeypatch.delenv(name, raising=False)
+
+
+class TestCpuQuota:
+    """Test CPU quota detection from cgroups"""
+
+    def test_cgroup_v2_quota(self, tmp_path):
+        """Test reading a cgroup v2 cpu.max limit"""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("250000 100000\n")
+        assert serving.cpu_quota(str(cpu_max), "missing", "missing") == 2.5
+
+    def test_cgroup_v2_unlimited_falls_back(self, tmp_path, monkeypatch):
+        """Test that an unlimited quota falls back to the core count"""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("max 100000\n")
+        monkeypatch.setattr(serving.os, "cpu_count", lambda: 8)
+        assert serving.cpu_quota(str(cpu_max), "missing", "missing") == 8.0
+
+    def test_cgroup_v1_quota(self, tmp_path):
+        """Test reading cgroup v1 CFS quota and period"""
+        quota = tmp_path / "cpu.cfs_quota_us"
+        period = tmp_path / "cpu.cfs_period_us"
+        quota.write_text("50000\n")
+        period.write_text("100000\n")
+        assert serving.cpu_quota("missing", str(quota), str(period)) == 0.5
+
+
+class TestWorkerCount:
+    """Test worker sizing"""
+
+    def test_fractional_quota_gets_one_worker(self):
+        """Test that sub-core limits still get a worker"""
+        assert serving.worker_count(0.5) == 1
+
+    def test_workers_follow_whole_cpus(self):
+        """Test that workers don't oversubscribe the quota"""
+        assert serving.worker_count(2.5) == 2
+
+    def test_web_concurrency_override(self, monkeypatch):
+        """Test that WEB_CONCURRENCY takes precedence"""
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")
+        assert serving.worker_count(1.0) == 4
+
+
+class TestServerConfig:
+    """Test uvicorn and gunicorn settings"""
+
+    def test_uvicorn_profile(self, monkeypatch):
+        """Test that the uvicorn profile pins uvloop/httptools and tuned sockets"""
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        config = serving.uvicorn_config()
+        assert config["loop"] == "uvloop"
+        assert config["http"] == "httptools"
+        assert config["workers"] == 2
+        assert config["timeout_keep_alive"] == 65
+        assert config["backlog"] == 2048
+
+    def test_gunicorn_recycling_off_by_default(self):
+        """Test that workers holding in-memory state are not recycled unless asked"""
+        settings = serving.gunicorn_settings()
+        assert settings["max_requests"] == 0
+        assert settings["max_requests_jitter"] == 0
+
+    def test_gunicorn_recycles_workers_with_jitter(self, monkeypatch, caplog):
+        """Test that opting into recycling applies jitter and warns about state loss"""
+        monkeypatch.setenv("MAX_REQUESTS", "1000")
+        settings = serving.gunicorn_settings()
+        assert settings["worker_class"] == "uvicorn_worker.TunedUvicornWorker"
+        assert settings["max_requests"] == 1000
+        assert settings["max_requests_jitter"] == 100
+        assert settings["bind"] == "0.0.0.0:8000"
+        assert "discards" in caplog.text
+
+    def test_gunicorn_worker_pins_loop_and_parser(self):
+        """Test that the gunicorn worker class doesn't fall back to loop/http auto"""
+        pytest.importorskip("gunicorn")
+        from uvicorn_worker import TunedUvicornWorker
+        assert TunedUvicornWorker.CONFIG_KWARGS == {"loop": "uvloop", "http": "httptools"}
+
+    def test_gunicorn_conf_module(self, monkeypatch):
+        """Test that the gunicorn config file exposes the settings as module globals"""
+        monkeypatch.setenv("WEB_CONCURRENCY", "3")
+        import gunicorn_conf
+        gunicorn_conf = importlib.reload(gunicorn_conf)
+        assert gunicorn_conf.workers == 3
+        assert gunicorn_conf.worker_class == "uvicorn_worker.TunedUvicornWorker"
+
+    def test_run_publishes_worker_count(self, monkeypatch):
+        """Test that the resolved worker count reaches the app's environment"""
+        uvicorn = pytest.importorskip("uvicorn")
+        monkeypatch.setenv("WEB_CONCURRENCY", "")
+        monkeypatch.setattr(serving, "cpu_quota", lambda: 3.0)
+        monkeypatch.setattr(uvicorn, "run", lambda app, **config: None)
+        serving.run()
+        assert serving.os.environ["WEB_CONCURRENCY"] == "3"
+
+    def test_unknown_server_mode(self, monkeypatch):
+        """Test that an unknown SERVER_MODE exits with an error"""
+        monkeypatch.setenv("SERVER_MODE", "bogus")
+        with pytest.raises(SystemExit):
+            serving.run()
@@ -0,0 +1,227 @@
+"""
+Test suite for CryptoSpins bulk balance export/import
+"""
+import json
+
+import pytest
+from fastapi import status
+
+import main
+from ledger import MAX_AMOUNT, Ledger, to_fixed
+from snapshot import (
+    BALANCE_MAGIC, MAX_USER_ID_LENGTH, BalanceDecoder, SnapshotFormatError, encode_balances, encode_bets,
+    import_balances,
+)
+
+ADMIN_HEADERS = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    """Enable admin endpoints with a known token"""
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(main, "SNAPSHOT_CHUNK_SIZE", 2)
+
+
+class TestCodecs:
+    """Test snapshot encoding and incremental decoding"""
+
+    def _ledger(self, users=5):
+        ledger = Ledger()
+        for i in range(users):
+            ledger.open_account(f"user-{i}", to_fixed(100.0 + i))
+        return ledger
+
+    @pytest.mark.parametrize("fmt", ["ndjson", "binary"])
+    def test_round_trip(self, fmt):
+        """Test that an export decodes back to the same balances"""
+        source = self._ledger()
+        payload = b"".join(encode_balances(source, fmt, chunk_size=2))
+        decoder = BalanceDecoder(fmt)
+        records = []
+        # Feed in awkward chunk sizes to exercise partial-record buffering
+        for offset in range(0, len(payload), 7):
+            records.extend(decoder.feed(payload[offset:offset + 7]))
+        records.extend(decoder.close())
+        assert records == list(source.balances())
+
+    def test_binary_header(self):
+        """Test that binary exports start with the format header"""
+        payload = b"".join(encode_balances(self._ledger(1), "binary"))
+        assert payload.startswith(BALANCE_MAGIC)
+
+    def test_export_is_chunked(self):
+        """Test that exports are produced incrementally"""
+        chunks = list(encode_balances(self._ledger(5), "ndjson", chunk_size=2))
+        assert len(chunks) == 3
+        assert chunks[0].count(b"\n") == 2
+
+    def test_ndjson_without_trailing_newline(self):
+        """Test that a final line without newline is still imported"""
+        decoder = BalanceDecoder("ndjson")
+        assert decoder.feed(b'{"user_id": "a", "balance": 1.5}') == []
+        assert decoder.close() == [("a", to_fixed(1.5))]
+
+    def test_ndjson_trailing_whitespace(self):
+        """Test that a complete NDJSON body ending in blank space is not treated as truncated"""
+        decoder = BalanceDecoder("ndjson")
+        assert decoder.feed(b'{"user_id": "a", "balance": 1.5}\n  ') == [("a", to_fixed(1.5))]
+        assert decoder.close() == []
+
+    @pytest.mark.parametrize("line", [
+        b'{"user_id": "a", "balance": Infinity}\n',
+        b'{"user_id": "a", "balance": 1e400}\n',
+        b'{"user_id": "a", "balance": 1e20}\n',
+        b'{"user_id": "a", "balance": 1' + b"0" * 400 + b'}\n',
+    ])
+    def test_ndjson_out_of_range_rejected(self, line):
+        """Test that non-finite or oversized balances are format errors, not crashes"""
+        with pytest.raises(SnapshotFormatError):
+            BalanceDecoder("ndjson").feed(line)
+
+    def test_binary_invalid_utf8_rejected(self):
+        """Test that a user_id that isn't UTF-8 is a format error"""
+        payload = BALANCE_MAGIC + b"\x02\x00\xff\xfe" + to_fixed(1.0).to_bytes(8, "little")
+        with pytest.raises(SnapshotFormatError):
+            BalanceDecoder("binary").feed(payload)
+
+    def test_truncated_binary_rejected(self):
+        """Test that a payload ending mid-record is rejected"""
+        payload = b"".join(encode_balances(self._ledger(1), "binary"))
+        decoder = BalanceDecoder("binary")
+        decoder.feed(payload[:-3])
+        with pytest.raises(SnapshotFormatError):
+            decoder.close()
+
+    def test_bad_header_rejected(self):
+        """Test that binary imports require the header"""
+        with pytest.raises(SnapshotFormatError):
+            BalanceDecoder("binary").feed(b"XXXX\x00\x00")
+
+    def test_negative_balance_rejected(self):
+        """Test that imports never create negative balances"""
+        with pytest.raises(SnapshotFormatError):
+            import_balances(Ledger(), [("a", -1)])
+
+    def test_out_of_range_batch_leaves_ledger_untouched(self):
+        """Test that one bad record rejects the whole batch before any mutation"""
+        ledger = self._ledger(1)
+        with pytest.raises(SnapshotFormatError):
+            import_balances(ledger, [("new", to_fixed(1.0)), ("huge", MAX_AMOUNT + 1)])
+        with pytest.raises(ValueError):
+            ledger.set_balances([("new", to_fixed(1.0)), ("huge", MAX_AMOUNT + 1)])
+        assert ledger.user_count() == 1
+        assert not ledger.has_account("new")
+        assert ledger.reconcile().ok
+
+    def test_long_user_id_rejected(self):
+        """Test that imports can't create ids the binary export could not encode"""
+        with pytest.raises(SnapshotFormatError):
+            import_balances(Ledger(), [("x" * (MAX_USER_ID_LENGTH + 1), 1)])
+
+    def test_import_adjusts_existing_accounts(self):
+        """Test that importing over an existing account keeps the journal balanced"""
+        ledger = self._ledger(1)
+        import_balances(ledger, [("user-0", to_fixed(50.0)), ("new", to_fixed(10.0))])
+        assert ledger.balance("user-0") == to_fixed(50.0)
+        assert ledger.balance("new") == to_fixed(10.0)
+        assert ledger.reconcile().ok
+
+    def test_bets_skip_removed_entries(self):
+        """Test that bets removed during export are skipped"""
+        history = {"a": {"user_id": "u", "amount": 1.0}, "b": {"user_id": "u", "amount": 2.0}}
+        chunks = encode_bets(history, chunk_size=1)
+        first = next(chunks)
+        del history["b"]
+        assert list(chunks) == []
+        assert json.loads(first)["bet_id"] == "a"
+
+
+class TestAdminEndpoints:
+    """Test the streaming admin endpoints"""
+
+    def test_disabled_without_token(self, client):
+        """Test that admin endpoints are off unless ADMIN_TOKEN is set"""
+        response = client.get("/admin/export/balances")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_wrong_token_rejected(self, client, admin):
+        """Test that a wrong admin token is rejected"""
+        response = client.get("/admin/export/balances", headers={"X-Admin-Token": "nope"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refused_with_multiple_workers(self, client, admin, monkeypatch):
+        """Test that admin endpoints refuse to act on one worker's slice of the state"""
+        monkeypatch.setattr(main, "SERVER_WORKERS", 2)
+        response = client.get("/admin/export/balances", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert "WEB_CONCURRENCY=1" in response.json()["detail"]
+        response = client.post("/admin/import/balances", content=b"", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_export_balances_ndjson(self, client, admin):
+        """Test NDJSON balance export"""
+        for user_id in ("alice", "bob", "carol"):
+            client.get(f"/balance/{user_id}")
+        response = client.get("/admin/export/balances", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert rows == [{"user_id": u, "balance": 1000.0} for u in ("alice", "bob", "carol")]
+
+    def test_export_unknown_format(self, client, admin):
+        """Test that unknown formats are rejected"""
+        response = client.get("/admin/export/balances?format=xml", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_export_bets(self, client, admin, sample_bet_data):
+        """Test NDJSON bet-history export"""
+        bet = client.post("/bet", json=sample_bet_data).json()
+        response = client.get("/admin/export/bets", headers=ADMIN_HEADERS)
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert rows[0]["bet_id"] == bet["bet_id"]
+        assert rows[0]["user_id"] == sample_bet_data["user_id"]
+
+    def test_binary_export_import_round_trip(self, client, admin):
+        """Test moving balances between pods with the binary format"""
+        client.get("/balance/alice")
+        client.post("/bet", json={"user_id": "bob", "amount": 12.5})
+        exported = client.get("/admin/export/balances?format=binary", headers=ADMIN_HEADERS).content
+        expected = list(main.ledger.balances())
+
+        main.ledger.reset()
+        response = client.post("/admin/import/balances?format=binary", content=exported,
+                               headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["imported"] == 2
+        assert list(main.ledger.balances()) == expected
+        assert main.ledger.reconcile().ok
+
+    def test_import_ndjson(self, client, admin):
+        """Test bulk NDJSON import and O(1) reads afterwards"""
+        body = "".join(json.dumps({"user_id": f"u{i}", "balance": i * 1.5}) + "\n" for i in range(100))
+        response = client.post("/admin/import/balances", content=body, headers=ADMIN_HEADERS)
+        assert response.json()["imported"] == 100
+        assert client.get("/balance/u10").json()["balance"] == 15.0
+
+    def test_import_invalid_payload(self, client, admin):
+        """Test that malformed imports return 400 with progress"""
+        body = '{"user_id": "a", "balance": 1}\nnot json\n'
+        response = client.post("/admin/import/balances", content=body, headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "users imported" in response.json()["detail"]
+
+    def test_import_huge_balance_is_400(self, client, admin):
+        """Test that an out-of-range balance is rejected and reconcile stays clean"""
+        body = '{"user_id": "a", "balance": 1}\n{"user_id": "b", "balance": 1e20}\n'
+        response = client.post("/admin/import/balances", content=body, headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert main.ledger.reconcile().ok
+
+    def test_user_id_length_capped(self, client):
+        """Test that ids too long to export are refused at the API"""
+        long_id = "x" * (MAX_USER_ID_LENGTH + 1)
+        assert client.get(f"/balance/{long_id}").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        response = client.post("/bet", json={"user_id": long_id, "amount": 1.0})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert main.ledger.user_count() == 0
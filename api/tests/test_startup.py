@@ -0,0 +1,65 @@
+"""
+Test suite for CryptoSpins startup warmup and readiness
+"""
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from main import app, bet_history, ledger, request_rates, warmup_state, WARMUP_USER_ID
+from warmup import asgi_request, run_warmup
+
+
+class TestReadiness:
+    """Test readiness reporting around warmup"""
+
+    def test_not_ready_before_warmup(self, client):
+        """Test that readiness reports unready until warmup has run"""
+        response = client.get("/readyz")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["status"] == "warming_up"
+
+    def test_ready_after_startup(self):
+        """Test that startup warms the pod and readiness then passes"""
+        with TestClient(app) as client:
+            response = client.get("/readyz")
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert data["status"] == "ready"
+            assert data["warmup_seconds"] >= 0
+
+    def test_warmup_leaves_no_state(self):
+        """Test that warmup requests do not leak balances or bets"""
+        with TestClient(app):
+            assert warmup_state.warm
+            assert not ledger.has_account(WARMUP_USER_ID)
+            assert ledger.journal_size == 0
+            assert not any(bet["user_id"] == WARMUP_USER_ID for bet in bet_history.values())
+            assert request_rates.rate("POST", "/bet") == 0.0
+            assert request_rates.rates() == {}
+
+    def test_health_unaffected_by_warmup(self, client):
+        """Test that the health endpoint stays up while warming"""
+        response = client.get("/health")
+        assert response.status_code == status.HTTP_200_OK
+
+
+class TestWarmupHelpers:
+    """Test in-process warmup request helpers"""
+
+    @pytest.mark.asyncio
+    async def test_asgi_request_status(self):
+        """Test that in-process requests report the response status"""
+        assert await asgi_request(app, "GET", "/") == 200
+        assert await asgi_request(app, "GET", "/bet/missing") == 404
+        assert await asgi_request(app, "POST", "/bet", {"user_id": "u", "amount": 0}) == 400
+
+    @pytest.mark.asyncio
+    async def test_run_warmup_returns_elapsed(self):
+        """Test that warmup reports its duration"""
+        elapsed = await run_warmup(app, [("GET", "/", None)], rounds=2)
+        assert elapsed >= 0
+
+    def test_openapi_schema_prebuilt(self):
+        """Test that the OpenAPI schema is built at import time"""
+        assert app.openapi_schema is not None
+        assert "/bet" in app.openapi_schema["paths"]